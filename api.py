@@ -1,32 +1,245 @@
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, field_validator
 from typing import List, Optional
 import os
-import shutil
 import tempfile
+import threading
+import uuid
+import asyncio
+import hashlib
+import gc
+import json
+import re
+from datetime import datetime
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from translator import translator
 from video_dubber import video_dubber
 from history import history_manager
 
-import gradio as gr
-from app import create_ui
-
 # Ensure temp directory exists and configure video_dubber
 project_temp = os.path.join(os.getcwd(), "temp")
 os.makedirs(project_temp, exist_ok=True)
 video_dubber.output_dir = project_temp
 print(f"API configured video_dubber output_dir: {project_temp}")
 
+# 翻譯/配音都是阻塞呼叫，丟進 thread pool 避免卡住 event loop
+# worker 數量可用 TG_WORKERS 環境變數調整
+POOL = ThreadPoolExecutor(max_workers=int(os.getenv("TG_WORKERS", "4")))
+
+# 上傳暫存檔集中放在專屬目錄，有 /dev/shm (tmpfs) 就用它，
+# 寫完馬上讀的 round-trip 不落磁碟；可用 TG_TMP 覆寫
+TMP_ROOT = os.environ.get(
+    "TG_TMP",
+    os.path.join("/dev/shm", "transgemma") if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+)
+os.makedirs(TMP_ROOT, exist_ok=True)
+
+# 每個 worker thread 重複使用同一塊 1 MiB 複製緩衝，避免每個請求重新配置
+_copy_buf = threading.local()
+
+
+def _save_upload(src_file, fd: int) -> str:
+    """用 thread-local 緩衝把上傳檔複製到 fd（readinto 不產生中間 bytes）
+
+    Returns:
+        內容的 blake2b 雜湊值（順手算好，供內容定址快取使用）
+    """
+    buf = getattr(_copy_buf, "buf", None)
+    if buf is None:
+        buf = _copy_buf.buf = bytearray(1 << 20)
+    view = memoryview(buf)
+    hasher = hashlib.blake2b(digest_size=16)
+    while n := src_file.readinto(buf):
+        hasher.update(view[:n])
+        os.write(fd, view[:n])
+    return hasher.hexdigest()
+
+# 翻譯結果快取：同樣的 (text, src, tgt) 結果是固定的，不需重跑模型
+# LRU，上限可用 TG_CACHE_SIZE 調整
+TRANSLATION_CACHE_SIZE = int(os.getenv("TG_CACHE_SIZE", "1024"))
+_translation_cache = OrderedDict()
+_translation_cache_lock = threading.Lock()
+
+
+def _cache_key(text: str, source_lang: str, target_lang: str) -> str:
+    return f"{hashlib.sha1(text.encode('utf-8')).hexdigest()}:{source_lang}:{target_lang}"
+
+
+def _cache_get(key: str):
+    with _translation_cache_lock:
+        if key in _translation_cache:
+            _translation_cache.move_to_end(key)
+            return _translation_cache[key]
+    return None
+
+
+def _cache_put(key: str, value: str):
+    with _translation_cache_lock:
+        _translation_cache[key] = value
+        _translation_cache.move_to_end(key)
+        while len(_translation_cache) > TRANSLATION_CACHE_SIZE:
+            _translation_cache.popitem(last=False)
+
+
+# orjson 序列化比 stdlib json 快數倍，長譯文/批次結果的回應省下不少 CPU
+# 沒裝 orjson 時退回預設 JSONResponse
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse
+    _default_response_class = ORJSONResponse
+except ImportError:
+    _default_response_class = JSONResponse
+
 app = FastAPI(
     title="TranslateGemma API",
     description="API for TranslateGemma Translation Service",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=_default_response_class
 )
 
+# 譯文/SRT 都是高度可壓縮的文字，gzip 可省 3-10 倍頻寬
+# 小回應 (<1KB) 不壓，影片檔走 FileResponse 不受影響
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+
+# 全域例外處理：取代各 endpoint 的 broad except Exception，
+# 記憶體相關錯誤要分開處理，不能吞掉當一般 500
+@app.exception_handler(MemoryError)
+async def _memory_error_handler(request, exc: MemoryError):
+    # 釋放快取 + 強制 GC，讓 server 有機會自行恢復
+    with _translation_cache_lock:
+        _translation_cache.clear()
+    gc.collect()
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server out of memory, please retry"},
+        headers={"Retry-After": "10"}
+    )
+
+
+@app.exception_handler(Exception)
+async def _unhandled_error_handler(request, exc: Exception):
+    return JSONResponse(status_code=500, content={"detail": str(exc)})
+
+# 動態 micro-batching：短時間窗內抵達的翻譯請求合併成一批送出，
+# 讓 Ollama 端 (OLLAMA_NUM_PARALLEL) 一次吃滿而不是 batch=1 零散打
+# TG_BATCH_MAX=1 時退回逐筆路徑（除錯用）
+class TranslationBatcher:
+    def __init__(self, max_batch: int = None, wait_ms: int = None):
+        self.max_batch = max_batch or int(os.getenv("TG_BATCH_MAX", "8"))
+        self.wait_ms = wait_ms or int(os.getenv("TG_BATCH_WAIT_MS", "15"))
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._worker())
+
+    async def submit(self, text: str, source_lang: str, target_lang: str) -> str:
+        if self.max_batch <= 1:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                POOL, translator.translate, text, source_lang, target_lang)
+
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((text, source_lang, target_lang, future))
+        return await future
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            # 再等一個小時間窗收齊同批請求
+            deadline = loop.time() + self.wait_ms / 1000
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # 整批同時丟進 thread pool，一次把後端平行度吃滿。
+            # 結果回填交給獨立 task——worker 不等慢請求跑完就收下一批，
+            # 否則後到的請求會被前一批最慢的成員整個卡住
+            futures = [
+                (fut, loop.run_in_executor(POOL, translator.translate, text, src, tgt))
+                for text, src, tgt, fut in batch
+            ]
+            asyncio.create_task(self._scatter(futures))
+
+    @staticmethod
+    async def _scatter(futures):
+        """等待 executor 結果並回填各請求的 future（單批的收尾）"""
+        for fut, task in futures:
+            try:
+                result = await task
+                if not fut.done():
+                    fut.set_result(result)
+            except Exception as e:
+                if not fut.done():
+                    fut.set_exception(e)
+
+
+_batcher = TranslationBatcher()
+
+
+@app.on_event("startup")
+async def _start_batcher():
+    _batcher.start()
+
+
+# 歷史記錄改走背景佇列：回應路徑只做 put_nowait，SQLite 寫入由
+# 單一背景 task 批次處理 (executemany)，不佔用請求延遲
+_history_queue: Optional[asyncio.Queue] = None
+
+
+def _log_history(**kwargs):
+    """將歷史記錄排入背景佇列；佇列還沒就緒時退回同步寫入"""
+    kwargs.setdefault("timestamp", datetime.now().isoformat())
+    if _history_queue is not None:
+        _history_queue.put_nowait(kwargs)
+    else:
+        history_manager.add_history_bulk([kwargs])
+
+
+async def _history_worker():
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _history_queue.get()]
+        # 盡量一次撈光，合併成單一交易
+        while True:
+            try:
+                batch.append(_history_queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        await loop.run_in_executor(POOL, history_manager.add_history_bulk, batch)
+
+
+@app.on_event("startup")
+async def _start_history_worker():
+    global _history_queue
+    _history_queue = asyncio.Queue()
+    asyncio.create_task(_history_worker())
+
 # Mount Gradio UI
 # 注意: Gradio 會接管 "/" 路徑，所以 API 文件移至 "/docs"
-app = gr.mount_gradio_app(app, create_ui(), path="/")
+# TG_ENABLE_UI=0 可關閉（API-only worker 不用付 Gradio/UI 的啟動時間與記憶體）
+if os.getenv("TG_ENABLE_UI", "1") == "1":
+    import gradio as gr
+    from app import create_ui
+
+    app = gr.mount_gradio_app(app, create_ui(), path="/")
+else:
+    from fastapi.responses import RedirectResponse
+
+    @app.get("/", include_in_schema=False)
+    async def _root_redirect():
+        return RedirectResponse(url="/docs")
 
 # Request Models
 class TextTranslationRequest(BaseModel):
@@ -34,12 +247,25 @@ class TextTranslationRequest(BaseModel):
     source_lang: str = "auto"
     target_lang: str = "zh_TW"
 
+# 嚴格的 YouTube URL 格式檢查，爛網址直接擋掉，不浪費整條影片 pipeline
+_YT_RE = re.compile(
+    r"^https?://(?:www\.|m\.)?"
+    r"(?:youtube\.com/watch\?[^\s]*v=[\w-]{11}|youtu\.be/[\w-]{11})"
+)
+
 class VideoDubRequest(BaseModel):
     url: str
     source_lang: str = "auto"
     target_langs: List[str] = ["zh_TW"]
     burn_subtitles: bool = True
 
+    @field_validator("url")
+    @classmethod
+    def validate_youtube_url(cls, v: str) -> str:
+        if not _YT_RE.match(v):
+            raise ValueError("Invalid YouTube URL")
+        return v
+
 # --- Endpoints ---
 
 # --- Endpoints ---
@@ -47,31 +273,76 @@ class VideoDubRequest(BaseModel):
 @app.post("/api/translate/text")
 async def translate_text_endpoint(request: TextTranslationRequest):
     """Translate text"""
-    try:
-        # Use the streaming method but consume it all for JSON response
-        # or use simple translate if available. translator.translate calls chat method.
-        # Let's use translator.translate which returns full string
-        if request.source_lang == "auto":
-             # translator.translate assumes a source lang or handles it. 
-             # Let's use "auto" if supported, or let translator handle it.
-             # Actually translator.translate(text, source, target)
-             pass
-
-        result = translator.translate(request.text, request.source_lang, request.target_lang)
-        
-        # Log history
-        history_manager.add_history(
-            type="text",
-            source_lang=request.source_lang,
-            target_lang=request.target_lang,
-            original_content=request.text,
-            translated_content=result,
-            details={"via": "api"}
-        )
-        
-        return {"translated_text": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # 先查快取，命中就完全不碰模型
+    key = _cache_key(request.text, request.source_lang, request.target_lang)
+    cached = _cache_get(key)
+    if cached is not None:
+        return {"translated_text": cached, "cached": True}
+
+    result = await _batcher.submit(
+        request.text, request.source_lang, request.target_lang
+    )
+
+    # 錯誤訊息不要進快取
+    if not result.startswith("❌"):
+        _cache_put(key, result)
+
+    # Log history
+    _log_history(
+        type="text",
+        source_lang=request.source_lang,
+        target_lang=request.target_lang,
+        original_content=request.text,
+        translated_content=result,
+        details={"via": "api"}
+    )
+
+    return {"translated_text": result}
+
+@app.post("/api/translate/text/stream")
+async def translate_text_stream_endpoint(request: TextTranslationRequest):
+    """Translate text with Server-Sent Events streaming (token-by-token)"""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def _producer():
+        # translate_stream 回傳的是累積字串，在這裡轉成增量再推給 client
+        previous = ""
+        try:
+            for accumulated in translator.translate_stream(
+                request.text, request.source_lang, request.target_lang
+            ):
+                delta = accumulated[len(previous):]
+                previous = accumulated
+                if delta:
+                    loop.call_soon_threadsafe(queue.put_nowait, (delta, None))
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, (None, previous))
+
+    async def _event_stream():
+        loop.run_in_executor(POOL, _producer)
+        full_result = ""
+        try:
+            while True:
+                delta, final = await queue.get()
+                if delta is None:
+                    full_result = final
+                    break
+                yield f"data: {json.dumps({'t': delta}, ensure_ascii=False)}\n\n"
+            yield "data: [DONE]\n\n"
+        finally:
+            # 完整串流結束才寫歷史，client 中斷不留半筆記錄
+            if full_result:
+                _log_history(
+                    type="text",
+                    source_lang=request.source_lang,
+                    target_lang=request.target_lang,
+                    original_content=request.text,
+                    translated_content=full_result,
+                    details={"via": "api", "stream": True}
+                )
+
+    return StreamingResponse(_event_stream(), media_type="text/event-stream")
 
 @app.post("/api/translate/image")
 async def translate_image_endpoint(
@@ -80,24 +351,36 @@ async def translate_image_endpoint(
     target_lang: str = Form("zh_TW")
 ):
     """Translate text from image file"""
-    try:
-        # Save temp file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp:
-            shutil.copyfileobj(file.file, tmp)
-            tmp_path = tmp.name
-        
+    tmp_path = None
+    try:  # noqa: SIM105 — finally 只負責清暫存檔，例外交給全域 handler
+        # 分塊寫入暫存檔，避免大圖整個進記憶體 (一次最多 1 MiB)
+        fd, tmp_path = tempfile.mkstemp(dir=TMP_ROOT, suffix=os.path.splitext(file.filename)[1])
+        loop = asyncio.get_running_loop()
+        try:
+            content_hash = await loop.run_in_executor(POOL, _save_upload, file.file, fd)
+        finally:
+            os.close(fd)
+
+        # 同一張圖 + 同語言組合上傳過就直接回快取，OCR/模型都不用跑
+        key = f"img:{content_hash}:{source_lang}:{target_lang}"
+        cached = _cache_get(key)
+        if cached is not None:
+            return {"translated_text": cached, "cached": True}
+
         # Translate
-        # translator.translate_image generator needs to be consumed
-        full_result = ""
-        for chunk in translator.translate_image(tmp_path, target_lang, source_lang):
-            full_result = chunk # accumulate or just take last update if it yields progress
-            # Actually translate_image yields accumulated text? 
-            # Check implementation. It yields accumulated text.
-        
-        os.unlink(tmp_path)
-        
+        # translate_image 每次 yield 的是「累積後的全文」，只需要最後一筆
+        # deque(maxlen=1) 在 C 層跑完整個 generator，不用 Python 迴圈逐筆 rebind
+        def _run_image_translation():
+            last = deque(translator.translate_image(tmp_path, target_lang, source_lang), maxlen=1)
+            return last[0] if last else ""
+
+        full_result = await loop.run_in_executor(POOL, _run_image_translation)
+
+        if full_result and not full_result.startswith(("❌", "⚠️")):
+            _cache_put(key, full_result)
+
         # Log history
-        history_manager.add_history(
+        _log_history(
             type="image",
             source_lang=source_lang,
             target_lang=target_lang,
@@ -107,21 +390,45 @@ async def translate_image_endpoint(
         )
 
         return {"translated_text": full_result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # 不論成功失敗都清掉暫存檔 (原本翻譯失敗會留下垃圾檔)
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+# 配音工作狀態表 (in-memory, 單一 process 即可)
+# {job_id: {"status": "queued|running|done|error", "results": {...}, "error": "..."}}
+DUB_JOBS = {}
+# 內容定址去重：同樣 (url, src, tgts, burn) 的工作共用同一個 job
+# {dedupe_key: job_id}
+DUB_KEYS = {}
+DUB_JOBS_LOCK = threading.Lock()
 
-@app.post("/api/dub/video")
-async def dub_video_endpoint(request: VideoDubRequest):
-    """
-    Dub a YouTube video.
-    Returns JSON with paths to generated files.
-    Note: Processing is synchronous and slow. For production, use background tasks.
-    """
-    try:
-        # Check if URL
-        if not request.url.startswith("http"):
-             raise HTTPException(status_code=400, detail="Only YouTube URLs supported in this endpoint for now")
 
+def _dub_dedupe_key(request: VideoDubRequest) -> str:
+    raw = f"{request.url}|{request.source_lang}|{','.join(request.target_langs)}|{request.burn_subtitles}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _set_job_status(job_id: str, **fields):
+    """更新工作狀態"""
+    with DUB_JOBS_LOCK:
+        DUB_JOBS.setdefault(job_id, {})
+        DUB_JOBS[job_id].update(fields)
+
+
+def _run_dub_job(job_id: str, request: VideoDubRequest):
+    """在背景執行配音流程 (BackgroundTasks 會在回應送出後呼叫)"""
+    _set_job_status(job_id, status="running")
+    history_manager.add_history(
+        type="video",
+        source_lang=request.source_lang,
+        target_lang=",".join(request.target_langs),
+        original_content=request.url,
+        translated_content="",
+        details={"via": "api", "job_id": job_id, "status": "running"}
+    )
+
+    try:
         # Determine single or batch
         if len(request.target_langs) == 1:
             target_lang = request.target_langs[0]
@@ -129,7 +436,7 @@ async def dub_video_endpoint(request: VideoDubRequest):
                 request.url, request.source_lang, target_lang,
                 burn_subtitles=request.burn_subtitles
             )
-            
+
             # Log history
             history_manager.add_history(
                 type="video",
@@ -137,34 +444,129 @@ async def dub_video_endpoint(request: VideoDubRequest):
                 target_lang=target_lang,
                 original_content=request.url,
                 translated_content=results.get('dubbed_video', ''),
-                details={"via": "api", "original_srt": results.get("original_srt")}
+                details={"via": "api", "job_id": job_id, "status": "done",
+                         "original_srt": results.get("original_srt")}
             )
-            
-            return results
         else:
             # Batch
             results = video_dubber.process_video_batch(
                 request.url, request.source_lang, request.target_langs,
                 burn_subtitles=request.burn_subtitles
             )
-            
-            # Log history handled inside caller? No, process_video_batch doesn't log history.
-            # We need to log it here repeatedly?
-            # Or make a helper. For now let's log loop.
+
             for lang, res in results.get('languages', {}).items():
-                 history_manager.add_history(
+                history_manager.add_history(
                     type="video_batch",
                     source_lang=request.source_lang,
                     target_lang=lang,
                     original_content=request.url,
                     translated_content=res.get('dubbed_video', ''),
-                    details={"via": "api", "batch_id": str(id(results))}
+                    details={"via": "api", "job_id": job_id, "status": "done"}
                 )
 
-            return results
-
+        _set_job_status(job_id, status="done", results=results)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        _set_job_status(job_id, status="error", error=str(e))
+        history_manager.add_history(
+            type="video",
+            source_lang=request.source_lang,
+            target_lang=",".join(request.target_langs),
+            original_content=request.url,
+            translated_content="",
+            details={"via": "api", "job_id": job_id, "status": "error", "error": str(e)}
+        )
+
+
+@app.post("/api/translate/image/stream")
+async def translate_image_stream_endpoint(
+    file: UploadFile = File(...),
+    source_lang: str = Form("auto"),
+    target_lang: str = Form("zh_TW")
+):
+    """Translate text from image with SSE streaming (OCR + partial translations)"""
+    # 先落地暫存檔（同 JSON 端點的分塊寫入）
+    fd, tmp_path = tempfile.mkstemp(dir=TMP_ROOT, suffix=os.path.splitext(file.filename)[1])
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(POOL, _save_upload, file.file, fd)
+    finally:
+        os.close(fd)
+
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def _producer():
+        last = ""
+        try:
+            for chunk in translator.translate_image(tmp_path, target_lang, source_lang):
+                last = chunk
+                loop.call_soon_threadsafe(queue.put_nowait, ("partial", chunk))
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, ("done", last))
+
+    async def _event_stream():
+        loop.run_in_executor(POOL, _producer)
+        final_result = ""
+        try:
+            while True:
+                event, payload = await queue.get()
+                if event == "done":
+                    final_result = payload
+                    yield f"event: done\ndata: {json.dumps({'t': payload}, ensure_ascii=False)}\n\n"
+                    break
+                yield f"event: partial\ndata: {json.dumps({'t': payload}, ensure_ascii=False)}\n\n"
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            if final_result:
+                _log_history(
+                    type="image",
+                    source_lang=source_lang,
+                    target_lang=target_lang,
+                    original_content=f"[API Upload] {file.filename}",
+                    translated_content=final_result,
+                    details={"via": "api", "stream": True}
+                )
+
+    return StreamingResponse(_event_stream(), media_type="text/event-stream")
+
+@app.post("/api/dub/video")
+async def dub_video_endpoint(request: VideoDubRequest, background_tasks: BackgroundTasks):
+    """
+    Dub a YouTube video.
+    Enqueues the job and returns immediately; poll the status_url for results.
+    """
+    # URL 格式已由 VideoDubRequest 的 validator 擋下，這裡直接排程
+    dedupe_key = _dub_dedupe_key(request)
+
+    with DUB_JOBS_LOCK:
+        existing_id = DUB_KEYS.get(dedupe_key)
+        existing = DUB_JOBS.get(existing_id) if existing_id else None
+        # 同樣的工作已排隊/處理中/完成 → 直接掛到既有 job，不重跑整條 pipeline
+        if existing is not None and existing.get("status") != "error":
+            return {
+                "job_id": existing_id,
+                "status": existing["status"],
+                "status_url": f"/api/dub/jobs/{existing_id}",
+                "deduplicated": True,
+            }
+
+        job_id = uuid.uuid4().hex
+        DUB_KEYS[dedupe_key] = job_id
+        DUB_JOBS[job_id] = {"status": "queued"}
+
+    background_tasks.add_task(_run_dub_job, job_id, request)
+
+    return {"job_id": job_id, "status": "queued", "status_url": f"/api/dub/jobs/{job_id}"}
+
+
+@app.get("/api/dub/jobs/{job_id}")
+async def dub_job_status_endpoint(job_id: str):
+    """Query the status/results of a dubbing job"""
+    with DUB_JOBS_LOCK:
+        job = DUB_JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job_id, **job}
 
 if __name__ == "__main__":
     import uvicorn
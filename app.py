@@ -12,9 +12,23 @@ TranslateGemma 網頁介面
     3. 55 種語言支援
 """
 
+import asyncio
+import functools
+import hashlib
+import os
+import tempfile
+import threading
+from collections import deque
+
 import gradio as gr
+import numpy as np
+
+from history import history_manager
+from languages import (LANGUAGES, COMMON_LANGUAGES, DISPLAY_STRINGS,
+                       SORTED_OTHER_CODES, get_language_info)
+from meeting_summarizer import MeetingSummarizer, SUMMARY_TYPES
 from translator import translator
-from languages import LANGUAGES, COMMON_LANGUAGES, get_language_info
+from video_dubber import VideoDubber
 
 # ============ 介面常數 ============
 TITLE = "🌐 TranslateGemma 翻譯工具"
@@ -29,29 +43,17 @@ DESCRIPTION = """
 """
 
 
+@functools.lru_cache(maxsize=1)
 def get_dropdown_choices():
-    """取得語言下拉選單選項"""
-    choices = []
-    
-    # 常用語言
-    for code in COMMON_LANGUAGES:
-        if code in LANGUAGES:
-            ch_name, en_name, locale = LANGUAGES[code]
-            choices.append((f"⭐ {ch_name} ({en_name})", code))
-    
-    # 其他語言
-    other_langs = [(code, info) for code, info in LANGUAGES.items() 
-                   if code not in COMMON_LANGUAGES]
-    other_langs.sort(key=lambda x: x[1][0])
-    
-    for code, (ch_name, en_name, locale) in other_langs:
-        choices.append((f"{ch_name} ({en_name})", code))
-    
-    return choices
+    """取得語言下拉選單選項（顯示字串與排序都在 languages.py import 時算好）"""
+    return tuple(
+        (DISPLAY_STRINGS[code], code)
+        for code in (*COMMON_LANGUAGES, *SORTED_OTHER_CODES)
+        if code in LANGUAGES
+    )
 
 
 # ========== 歷史記錄管理 ==========
-from history import history_manager
 
 def translate_text(text: str, source_lang: str, target_lang: str):
     """文字翻譯（串流）"""
@@ -127,35 +129,64 @@ def translate_pdf(pdf_file, source_lang: str, target_lang: str):
     )
 
 
-import asyncio
+# TTS 共用一條常駐 event loop（daemon thread）：
+# 每次 new_event_loop/close 會重建 SSL/aiohttp 狀態，連線也無法 keep-alive
+_tts_loop = asyncio.new_event_loop()
+threading.Thread(target=_tts_loop.run_forever, daemon=True).start()
+
+
+# 每塊至少累積 ~48KB（128kbps MP3 約 3 秒）再推給前端，太碎會播放斷續
+TTS_STREAM_MIN_BYTES = 48 * 1024
 
-def translate_voice(audio, source_lang: str, target_lang: str):
-    """語音翻譯（STT → 翻譯 → TTS）"""
+
+def run_tts_stream(text: str, language_code: str, timeout: float = 30.0):
+    """同步端逐塊取得 TTS MP3 bytes（在常駐 loop 上驅動 async 產生器）"""
+    agen = translator.text_to_speech_stream(text, language_code)
+    pending = bytearray()
+    try:
+        while True:
+            future = asyncio.run_coroutine_threadsafe(agen.__anext__(), _tts_loop)
+            try:
+                pending.extend(future.result(timeout=timeout))
+            except StopAsyncIteration:
+                break
+            if len(pending) >= TTS_STREAM_MIN_BYTES:
+                yield bytes(pending)
+                pending.clear()
+        if pending:
+            yield bytes(pending)
+    except Exception as e:
+        print(f"TTS 錯誤: {e}")
+
+
+async def translate_voice(audio, source_lang: str, target_lang: str):
+    """語音翻譯（STT → 翻譯 → TTS）
+
+    async handler：CPU 密集的 STT/翻譯丟到 executor，TTS 直接 await，
+    不佔住 Gradio 的 event loop，串流 callback 不會被長任務卡住
+    """
     if audio is None:
         return "請錄製或上傳音檔...", "", None
-    
+
+    loop = asyncio.get_running_loop()
+
     # 1. 語音辨識 (STT)
-    recognized_text, detected_lang = translator.speech_to_text(audio, source_lang)
-    
+    recognized_text, detected_lang = await loop.run_in_executor(
+        None, translator.speech_to_text, audio, source_lang)
+
     if recognized_text.startswith("❌"):
         return recognized_text, "", None
-    
+
     if not recognized_text:
         return "⚠️ 無法識別語音內容", "", None
-    
+
     # 2. 翻譯文字
-    translated_text = translator.translate(recognized_text, source_lang, target_lang)
-    
-    # 3. 文字轉語音 (TTS)
-    try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        audio_path = loop.run_until_complete(translator.text_to_speech(translated_text, target_lang))
-        loop.close()
-    except Exception as e:
-        audio_path = None
-        print(f"TTS 錯誤: {e}")
-    
+    translated_text = await loop.run_in_executor(
+        None, translator.translate, recognized_text, source_lang, target_lang)
+
+    # 3. 文字轉語音 (TTS) — 本身就是 coroutine，直接在當前 loop await
+    audio_path = await translator.text_to_speech(translated_text, target_lang)
+
     # 寫入歷史記錄
     history_manager.add_history(
         type="voice",
@@ -170,10 +201,6 @@ def translate_voice(audio, source_lang: str, target_lang: str):
 
 
 # ========== 影片翻譯功能 ==========
-from video_dubber import VideoDubber
-
-# ========== 會議摘要功能 ==========
-from meeting_summarizer import MeetingSummarizer, SUMMARY_TYPES
 
 # 全域影片處理器
 video_dubber_instance = None
@@ -296,59 +323,127 @@ def process_video_translation(video_source, source_lang: str, target_langs,
         return None, None, None, None, f"❌ 錯誤: {str(e)}", None
 
 
-import numpy as np
-import tempfile
-import wave
-import os
+# Whisper 在靜音/尾端常見的幻覺句，出現時當成空白丟棄
+WHISPER_HALLUCINATIONS = {
+    "Thanks for watching!",
+    "Thanks for watching.",
+    "Thank you.",
+    "Thank you for watching.",
+    "請訂閱我的頻道",
+    "字幕由 Amara.org 社群提供",
+}
 
-# 串流翻譯的全域狀態
+
+# 串流翻譯的 per-session 狀態
 class StreamState:
     def __init__(self):
-        self.audio_buffer = []
+        # 預先配置的 int16 緩衝：逐塊 index-copy 寫入，flush 取 view，
+        # 免去「list append + 整段 np.concatenate」的全緩衝複製
+        self.audio_ring = None
+        self.write_pos = 0
         self.sample_rate = 16000
         self.silence_threshold = 0.02  # 提高門檻值（降低敏感度）
         self.min_audio_length = 3.0    # 最少累積 3 秒（原本 1 秒）
         self.max_audio_length = 15.0   # 最多累積 15 秒（原本 10 秒）
-        self.silence_count = 0         # 連續靜音計數
-        self.silence_chunks_needed = 3 # 需要連續 3 個靜音片段才判定為段落結束
+
+        # 滑動視窗端點偵測（取代單純的連續靜音計數）：
+        # 最近 N 個片段中有聲比例低於 vad_ratio 才判定段落結束，
+        # 比連續計數更抗單一雜訊片段誤觸發
+        self.vad_window = 20           # N: 視窗大小（片段數）
+        self.vad_ratio = 0.3           # ρ: 有聲比例門檻
+        self.vad_need = self.vad_ratio * self.vad_window  # ρ·N 預先算好
+        self.frame_flags = deque(maxlen=self.vad_window)  # 1=有聲, 0=靜音
+
+        # 段落邊界補償：避免 Whisper 在切點吃掉字
+        self.pre_roll_sec = 0.5        # 送辨識前補 0.5 秒靜音前導
+        self.carry_over_sec = 0.1      # 保留最後 0.1 秒接到下一段開頭
+        self.carry_over = None
+
+        # 最近處理過的段落指紋（LRU 16 筆），重複辨識結果不再翻譯/合成
+        self.recent_hashes = deque(maxlen=16)
+
         self.last_transcript = ""
-        self.full_transcript = ""
-        self.full_translation = ""
+        # 逐段存 deque、輸出時才 join：長時間 session 下 += 會是 O(N²)
+        # maxlen 同時讓超長會議的記憶體有上限（自動丟最舊段落）
+        self.transcript_segments = deque(maxlen=500)
+        self.translation_segments = deque(maxlen=500)
+
+    @property
+    def full_transcript(self) -> str:
+        return " ".join(self.transcript_segments)
 
-stream_state = StreamState()
+    @property
+    def full_translation(self) -> str:
+        return " ".join(self.translation_segments)
 
+    def reset_buffer(self):
+        """清空音訊緩衝與端點偵測視窗（carry_over 保留給下一段使用）"""
+        self.write_pos = 0
+        self.frame_flags.clear()
 
-def is_silence(audio_chunk: np.ndarray, threshold: float = 0.02) -> bool:
-    """判斷音訊片段是否為靜音（提高門檻值降低敏感度）"""
+    def append_audio(self, chunk: np.ndarray, sample_rate: int) -> int:
+        """片段寫入預配置緩衝，回傳實際寫入樣本數（滿了會截斷，呼叫端應 flush）"""
+        capacity = int(self.max_audio_length * sample_rate)
+        if self.audio_ring is None or len(self.audio_ring) != capacity:
+            self.audio_ring = np.empty(capacity, dtype=np.int16)
+            self.write_pos = 0
+        n = min(len(chunk), capacity - self.write_pos)
+        if n > 0:
+            self.audio_ring[self.write_pos:self.write_pos + n] = \
+                chunk[:n].astype(np.int16, copy=False)
+            self.write_pos += n
+        return n
+
+    def buffered_audio(self) -> np.ndarray:
+        """目前累積音訊（緩衝的 view，零複製）"""
+        if self.audio_ring is None:
+            return np.empty(0, dtype=np.int16)
+        return self.audio_ring[:self.write_pos]
+
+    def endpoint_reached(self) -> bool:
+        """視窗內有聲片段比例低於 ρ·N 即視為段落結束"""
+        if len(self.frame_flags) < self.vad_window:
+            return False
+        return sum(self.frame_flags) < self.vad_need
+
+def chunk_sum_sq(audio_chunk: np.ndarray) -> float:
+    """計算片段平方和（np.dot 單次融合運算，不產生中間陣列）"""
+    if audio_chunk is None or len(audio_chunk) == 0:
+        return 0.0
+    if audio_chunk.dtype == np.int16:
+        # int16·int16 要指明 int64 累加器（np.dot 會維持 int16 直接溢位），
+        # einsum 單次融合運算，免去整份 float 複製
+        return float(np.einsum('i,i->', audio_chunk, audio_chunk, dtype=np.int64))
+    # 其他 dtype：單次融合乘法（float32 輸出），不產生 float64 中間陣列
+    return float(np.multiply(audio_chunk, audio_chunk, dtype=np.float32).sum())
+
+
+def is_silence(audio_chunk: np.ndarray, threshold: float = 0.02, sum_sq: float = None) -> bool:
+    """判斷音訊片段是否為靜音（提高門檻值降低敏感度）
+
+    sum_sq 已算好時直接複用，避免重複掃一次陣列
+    """
     if audio_chunk is None or len(audio_chunk) == 0:
         return True
-    rms = np.sqrt(np.mean(audio_chunk.astype(float) ** 2))
+    if sum_sq is None:
+        sum_sq = chunk_sum_sq(audio_chunk)
+    rms = np.sqrt(sum_sq / len(audio_chunk))
     return rms < threshold * 32768  # 16-bit audio
 
 
-def save_audio_buffer(audio_data: np.ndarray, sample_rate: int) -> str:
-    """將音訊緩衝儲存為臨時 WAV 檔案"""
-    temp_dir = tempfile.gettempdir()
-    temp_path = os.path.join(temp_dir, f"stream_audio_{id(audio_data)}.wav")
-    
-    with wave.open(temp_path, 'wb') as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(2)  # 16-bit
-        wf.setframerate(sample_rate)
-        wf.writeframes(audio_data.astype(np.int16).tobytes())
-    
-    return temp_path
+def process_stream_chunk(audio_chunk, source_lang: str, target_lang: str,
+                         silence_threshold: float = 0.02, state: StreamState = None):
+    """處理串流音訊片段（state 為 gr.State 的 per-session 狀態）"""
+    # 第一個 chunk 時建立本 session 專屬狀態，不同使用者互不干擾
+    if state is None:
+        state = StreamState()
 
-
-def process_stream_chunk(audio_chunk, source_lang: str, target_lang: str, silence_threshold: float = 0.02):
-    """處理串流音訊片段"""
-    global stream_state
-    
     # 更新靜音門檻值
-    stream_state.silence_threshold = silence_threshold
-    
+    state.silence_threshold = silence_threshold
+
     if audio_chunk is None:
-        return stream_state.full_transcript, stream_state.full_translation, "等待語音輸入...", None
+        yield state.full_transcript, state.full_translation, "等待語音輸入...", None, state
+        return
     
     sample_rate, audio_data = audio_chunk
     
@@ -356,79 +451,92 @@ def process_stream_chunk(audio_chunk, source_lang: str, target_lang: str, silenc
     if len(audio_data.shape) > 1:
         audio_data = audio_data.mean(axis=1)
     
-    # 累積音訊
-    stream_state.audio_buffer.append(audio_data)
-    stream_state.sample_rate = sample_rate
-    
-    # 計算累積長度
-    total_samples = sum(len(chunk) for chunk in stream_state.audio_buffer)
-    audio_length = total_samples / sample_rate
-    
+    # 累積音訊；本塊平方和算一次，靜音判斷直接複用
+    sq = chunk_sum_sq(audio_data)
+    written = state.append_audio(audio_data, sample_rate)
+    state.sample_rate = sample_rate
+
+    audio_length = state.write_pos / sample_rate
+
     # 改進的靜音偵測：需要連續多個靜音片段
-    is_silent = is_silence(audio_data, stream_state.silence_threshold)
-    
-    if is_silent:
-        stream_state.silence_count += 1
-    else:
-        stream_state.silence_count = 0  # 重置計數
-    
-    # 判斷是否應該處理
-    continuous_silence = stream_state.silence_count >= stream_state.silence_chunks_needed
+    is_silent = is_silence(audio_data, state.silence_threshold, sum_sq=sq)
+
+    state.frame_flags.append(0 if is_silent else 1)
+
+    # 判斷是否應該處理（視窗式端點偵測 + 長度上限保底 + 緩衝寫滿強制 flush）
     should_process = (
-        (continuous_silence and audio_length >= stream_state.min_audio_length) or
-        (audio_length >= stream_state.max_audio_length)
+        (state.endpoint_reached() and audio_length >= state.min_audio_length) or
+        (audio_length >= state.max_audio_length) or
+        (written < len(audio_data))
     )
-    
+
     if not should_process:
         silence_indicator = "🔇" if is_silent else "🔊"
         status = f"🎤 錄音中... ({audio_length:.1f}s) {silence_indicator}"
-        return stream_state.full_transcript, stream_state.full_translation, status, None
-    
-    # 合併並處理音訊
-    full_audio = np.concatenate(stream_state.audio_buffer)
-    stream_state.audio_buffer = []  # 清空緩衝
-    stream_state.silence_count = 0  # 重置靜音計數
-    
-    # 儲存為臨時檔案
-    temp_path = save_audio_buffer(full_audio, sample_rate)
-    
-    tts_audio_path = None
+        yield state.full_transcript, state.full_translation, status, None, state
+        return
     
+    # 取出累積音訊（緩衝 view；只有接 carry_over 時才需要一次 concat）
+    # 段首接上前一段保留的尾音，段尾保留 0.1 秒給下一段，切點不吃字
+    buffered = state.buffered_audio()
+    if state.carry_over is not None:
+        full_audio = np.concatenate([state.carry_over, buffered])
+    else:
+        full_audio = buffered
+
+    n_carry = int(state.carry_over_sec * sample_rate)
+    state.carry_over = full_audio[-n_carry:].copy() if n_carry > 0 else None
+    state.reset_buffer()
+
+    tts_text = None
+
     try:
-        # STT
-        recognized, detected_lang = translator.speech_to_text(temp_path, source_lang)
+        # STT：直接把 float32 陣列交給 Whisper，不落地 WAV 暫存檔
+        # 前面補 0.5 秒靜音，降低開頭被截斷/幻覺的機率
+        pre_roll = np.zeros(int(state.pre_roll_sec * sample_rate), dtype=full_audio.dtype)
+        audio_f32 = np.multiply(
+            np.concatenate([pre_roll, full_audio]), 1.0 / 32768.0, dtype=np.float32)
+        recognized, detected_lang = translator.speech_to_text_array(
+            audio_f32, sample_rate, source_lang)
         
+        # 幻覺句直接丟棄，不翻譯也不合成
+        if recognized in WHISPER_HALLUCINATIONS:
+            recognized = ""
+
         if recognized and not recognized.startswith("❌"):
-            stream_state.full_transcript += recognized + " "
-            
-            # 翻譯
-            translated = translator.translate(recognized, source_lang, target_lang)
-            stream_state.full_translation += translated + " "
-            
-            # TTS - 生成翻譯語音
-            try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                tts_audio_path = loop.run_until_complete(translator.text_to_speech(translated, target_lang))
-                loop.close()
-            except Exception as e:
-                print(f"TTS 錯誤: {e}")
-        
-        # 清理臨時檔案
-        os.remove(temp_path)
-        
+            # 同樣內容剛處理過（靜音時 Whisper 常吐重複句）就跳過整段
+            digest = hashlib.blake2b(recognized.encode("utf-8"), digest_size=8).digest()
+            if digest not in state.recent_hashes:
+                state.recent_hashes.append(digest)
+                state.transcript_segments.append(recognized)
+
+                # 翻譯
+                translated = translator.translate(recognized, source_lang, target_lang)
+                state.translation_segments.append(translated)
+
+                # TTS - 生成翻譯語音（譯文為空或與原文相同時不用唸）
+                if translated.strip() and translated != recognized:
+                    tts_text = translated
+
     except Exception as e:
         print(f"串流處理錯誤: {e}")
-    
+
     status = "✅ 段落處理完成，繼續說話..."
-    return stream_state.full_transcript.strip(), stream_state.full_translation.strip(), status, tts_audio_path
+
+    # 邊合成邊播：TTS bytes 逐塊推給 streaming Audio，第一塊到就開始播，
+    # 不再等整個 MP3 落地後讓瀏覽器重新抓檔
+    emitted = False
+    if tts_text:
+        for audio_bytes in run_tts_stream(tts_text, target_lang):
+            emitted = True
+            yield state.full_transcript, state.full_translation, status, audio_bytes, state
+    if not emitted:
+        yield state.full_transcript, state.full_translation, status, None, state
 
 
 def reset_stream_state():
-    """重置串流狀態"""
-    global stream_state
-    stream_state = StreamState()
-    return "", "", "已重置，準備開始錄音", None
+    """重置串流狀態（回傳全新的 per-session 狀態）"""
+    return "", "", "已重置，準備開始錄音", None, StreamState()
 
 
 def swap_languages(source: str, target: str):
@@ -496,8 +604,10 @@ def create_history_tab():
 def create_ui():
     """建立 Gradio 介面"""
     
-    language_choices = get_dropdown_choices()
-    
+    language_choices = list(get_dropdown_choices())
+    # 帶「自動偵測」的版本也只組一次，供多個 Dropdown 共用
+    auto_language_choices = [("🔍 自動偵測", "auto")] + language_choices
+
     with gr.Blocks(
         title=TITLE,
     ) as demo:
@@ -582,7 +692,7 @@ def create_ui():
                 
                 with gr.Row():
                     image_source_lang = gr.Dropdown(
-                        choices=[("🔍 自動偵測", "auto")] + language_choices,
+                        choices=auto_language_choices,
                         value="auto",
                         label="圖片文字語言"
                     )
@@ -654,7 +764,7 @@ def create_ui():
                 
                 with gr.Row():
                     voice_source_lang = gr.Dropdown(
-                        choices=[("🔍 自動偵測", "auto")] + language_choices,
+                        choices=auto_language_choices,
                         value="auto",
                         label="語音語言"
                     )
@@ -712,7 +822,7 @@ def create_ui():
                 
                 with gr.Row():
                     stream_source_lang = gr.Dropdown(
-                        choices=[("🔍 自動偵測", "auto")] + language_choices,
+                        choices=auto_language_choices,
                         value="en_US",
                         label="語音語言"
                     )
@@ -761,23 +871,30 @@ def create_ui():
                 
                 stream_tts_output = gr.Audio(
                     label="🔊 翻譯語音（自動播放）",
-                    type="filepath",
+                    streaming=True,
                     autoplay=True,
+                    format="mp3",
                     interactive=False
                 )
                 
                 reset_btn = gr.Button("🔄 重置", variant="secondary")
-                
+
+                # 每個 session 自己的串流狀態，多使用者同時錄音不會互相蓋緩衝
+                stream_session_state = gr.State(value=None)
+
                 # 串流處理
                 stream_audio.stream(
                     fn=process_stream_chunk,
-                    inputs=[stream_audio, stream_source_lang, stream_target_lang, silence_threshold_slider],
-                    outputs=[stream_transcript, stream_translation, stream_status, stream_tts_output]
+                    inputs=[stream_audio, stream_source_lang, stream_target_lang,
+                            silence_threshold_slider, stream_session_state],
+                    outputs=[stream_transcript, stream_translation, stream_status,
+                             stream_tts_output, stream_session_state]
                 )
-                
+
                 reset_btn.click(
                     fn=reset_stream_state,
-                    outputs=[stream_transcript, stream_translation, stream_status, stream_tts_output]
+                    outputs=[stream_transcript, stream_translation, stream_status,
+                             stream_tts_output, stream_session_state]
                 )
                 
                 gr.Markdown("""
@@ -806,7 +923,7 @@ def create_ui():
                 
                 with gr.Row():
                     video_source_lang = gr.Dropdown(
-                        choices=[("🔍 自動偵測", "auto")] + language_choices,
+                        choices=auto_language_choices,
                         value="auto",
                         label="影片語言"
                     )
@@ -953,7 +1070,7 @@ def create_ui():
                         )
                         
                         meeting_language = gr.Dropdown(
-                            choices=[("🔍 自動偵測", "auto")] + language_choices,
+                            choices=auto_language_choices,
                             value="auto",
                             label="會議語言"
                         )
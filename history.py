@@ -1,46 +1,77 @@
+import atexit
 import sqlite3
 import json
 import os
+import queue
+import threading
+import time
 from datetime import datetime
 from typing import List, Dict, Optional, Any
 
+# 背景寫入批次參數：湊滿 64 筆或等滿 1 秒就 flush 一次
+FLUSH_BATCH_SIZE = 64
+FLUSH_INTERVAL_SEC = 1.0
+
+
 class HistoryManager:
     def __init__(self, db_path: str = "history.db"):
         self.db_path = db_path
+        # 單一常駐連線 + WAL：避免每次操作重開連線、每筆 commit 都 fsync
+        # check_same_thread=False 搭配 self._lock 供多執行緒使用
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row  # 讓回傳結果可以用欄位名存取
+        self._lock = threading.Lock()
         self._init_db()
 
+        # 寫入走背景批次：add_history 只 put 進 queue（不 fsync 不擋呼叫端），
+        # 背景執行緒用 executemany 單一交易寫入。
+        # _inflight 是 worker 手上已出隊、尚未 commit 的批次：
+        # flush/clear 靠它等到在途寫入完成，保證語義完整
+        self._pending = queue.Queue()
+        self._inflight: List[tuple] = []
+        self._inflight_cond = threading.Condition()
+        self._writer = threading.Thread(target=self._flush_worker, daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
     def _init_db(self):
         """初始化資料庫表格"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 建立歷史記錄表
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT NOT NULL,
-            type TEXT NOT NULL,
-            source_lang TEXT,
-            target_lang TEXT,
-            original_content TEXT,
-            translated_content TEXT,
-            details TEXT
-        )
-        ''')
-        
-        conn.commit()
-        conn.close()
-
-    def add_history(self, 
-                    type: str, 
-                    source_lang: str, 
-                    target_lang: str, 
-                    original_content: str, 
-                    translated_content: str, 
+        with self._lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("PRAGMA temp_store=MEMORY")
+
+            # 建立歷史記錄表
+            self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                type TEXT NOT NULL,
+                source_lang TEXT,
+                target_lang TEXT,
+                original_content TEXT,
+                translated_content TEXT,
+                details TEXT
+            )
+            ''')
+
+            # 讓 get_history(type_filter=...) 走索引範圍掃描而非全表掃描+排序
+            self.conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_hist_type_ts ON history(type, timestamp DESC)
+            ''')
+
+            self.conn.commit()
+
+    def add_history(self,
+                    type: str,
+                    source_lang: str,
+                    target_lang: str,
+                    original_content: str,
+                    translated_content: str,
                     details: Optional[Dict[str, Any]] = None):
         """
         新增一筆歷史記錄
-        
+
         Args:
             type: 'text', 'image', 'pdf', 'voice', 'video'
             source_lang: 來源語言代碼
@@ -49,44 +80,128 @@ class HistoryManager:
             translated_content: 翻譯內容或檔案路徑
             details: 額外資訊 (JSON serializable dict)
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         timestamp = datetime.now().isoformat()
         details_json = json.dumps(details, ensure_ascii=False) if details else "{}"
-        
-        cursor.execute('''
-        INSERT INTO history (timestamp, type, source_lang, target_lang, original_content, translated_content, details)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (timestamp, type, source_lang, target_lang, original_content, translated_content, details_json))
-        
-        conn.commit()
-        conn.close()
-        
+
+        # 非阻塞：只排進 queue，實際寫入由背景執行緒批次處理
+        self._pending.put((timestamp, type, source_lang, target_lang,
+                           original_content, translated_content, details_json))
+
+    def _write_rows(self, rows: List[tuple]):
+        """單一交易寫入多筆 row（executemany）"""
+        with self._lock:
+            self.conn.executemany('''
+            INSERT INTO history (timestamp, type, source_lang, target_lang, original_content, translated_content, details)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            self.conn.commit()
+
+    def _flush_worker(self):
+        """背景寫入迴圈：湊批（上限 FLUSH_BATCH_SIZE 或 1 秒）後一次寫入"""
+        while True:
+            try:
+                batch = [self._pending.get(timeout=FLUSH_INTERVAL_SEC)]
+            except queue.Empty:
+                continue
+
+            deadline = time.monotonic() + FLUSH_INTERVAL_SEC
+            while len(batch) < FLUSH_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            with self._inflight_cond:
+                self._inflight = batch
+            try:
+                self._write_rows(batch)
+            except Exception as e:
+                print(f"歷史記錄寫入錯誤: {e}")
+            finally:
+                with self._inflight_cond:
+                    self._inflight = []
+                    self._inflight_cond.notify_all()
+
+    def _wait_inflight(self):
+        """等背景執行緒手上的在途批次 commit 完"""
+        with self._inflight_cond:
+            while self._inflight:
+                self._inflight_cond.wait()
+
+    def flush(self):
+        """把 queue 裡還沒寫入的記錄立刻落盤（讀取前與程式結束時呼叫）
+
+        同時等待背景執行緒已出隊、尚未 commit 的批次，
+        「剛寫的記錄查得到」才不是 best-effort。
+        """
+        batch = []
+        while True:
+            try:
+                batch.append(self._pending.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write_rows(batch)
+        self._wait_inflight()
+
+    def add_history_bulk(self, records: List[Dict[str, Any]]):
+        """
+        批次新增多筆歷史記錄（單一交易 + executemany）
+
+        Args:
+            records: 每筆為 add_history 的參數 dict
+        """
+        if not records:
+            return
+
+        timestamp = datetime.now().isoformat()
+        rows = []
+        for r in records:
+            details = r.get("details")
+            details_json = json.dumps(details, ensure_ascii=False) if details else "{}"
+            rows.append((
+                r.get("timestamp", timestamp),
+                r["type"],
+                r.get("source_lang"),
+                r.get("target_lang"),
+                r.get("original_content"),
+                r.get("translated_content"),
+                details_json
+            ))
+
+        with self._lock:
+            self.conn.executemany('''
+            INSERT INTO history (timestamp, type, source_lang, target_lang, original_content, translated_content, details)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            self.conn.commit()
+
     def get_history(self, limit: int = 50, offset: int = 0, type_filter: Optional[str] = None) -> List[Dict]:
         """
         取得歷史記錄
-        
+
         Returns:
             List of dicts
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # 讓回傳結果可以用欄位名存取
-        cursor = conn.cursor()
-        
+        # 先把排隊中的寫入落盤，確保剛寫的記錄查得到
+        self.flush()
+
         query = "SELECT * FROM history"
         params = []
-        
+
         if type_filter:
             query += " WHERE type = ?"
             params.append(type_filter)
-            
+
         query += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
         params.extend([limit, offset])
-        
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        
+
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+
         results = []
         for row in rows:
             results.append({
@@ -99,17 +214,22 @@ class HistoryManager:
                 "translated_content": row["translated_content"],
                 "details": json.loads(row["details"]) if row["details"] else {}
             })
-            
-        conn.close()
+
         return results
 
     def clear_history(self):
-        """清空所有歷史記錄"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM history")
-        conn.commit()
-        conn.close()
+        """清空所有歷史記錄（連同排隊中、在途批次裡的記錄一起丟棄）"""
+        # 先丟掉佇列裡的記錄，否則背景執行緒會在 DELETE 後把它們補寫回去
+        while True:
+            try:
+                self._pending.get_nowait()
+            except queue.Empty:
+                break
+        # 在途批次等它 commit 完再刪，DELETE 之後不會再冒出舊資料
+        self._wait_inflight()
+        with self._lock:
+            self.conn.execute("DELETE FROM history")
+            self.conn.commit()
 
 # 單例模式
 history_manager = HistoryManager()
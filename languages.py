@@ -78,28 +78,28 @@ COMMON_LANGUAGES = [
 ]
 
 
+# 顯示字串在 import 時一次格式化好，熱路徑不再重跑 f-string
+DISPLAY_STRINGS = {
+    code: f"{'⭐ ' if code in COMMON_LANGUAGES else ''}{ch_name} ({en_name})"
+    for code, (ch_name, en_name, _locale) in LANGUAGES.items()
+}
+
+# 下拉選單順序也預先排好：常用語言 → 分隔線 → 其他語言（依中文名稱排序）
+SORTED_OTHER_CODES = tuple(sorted(
+    (code for code in LANGUAGES if code not in COMMON_LANGUAGES),
+    key=lambda code: LANGUAGES[code][0]
+))
+
+_LANGUAGE_CHOICES = tuple(
+    [(DISPLAY_STRINGS[code], code) for code in COMMON_LANGUAGES if code in LANGUAGES]
+    + [("─" * 20, None)]
+    + [(DISPLAY_STRINGS[code], code) for code in SORTED_OTHER_CODES]
+)
+
+
 def get_language_choices():
     """取得語言選項清單（用於 Gradio Dropdown）"""
-    choices = []
-    
-    # 先加入常用語言
-    for code in COMMON_LANGUAGES:
-        if code in LANGUAGES:
-            ch_name, en_name, locale = LANGUAGES[code]
-            choices.append((f"⭐ {ch_name} ({en_name})", code))
-    
-    # 加入分隔線
-    choices.append(("─" * 20, None))
-    
-    # 再加入其他語言（按中文名稱排序）
-    other_langs = [(code, info) for code, info in LANGUAGES.items() 
-                   if code not in COMMON_LANGUAGES]
-    other_langs.sort(key=lambda x: x[1][0])
-    
-    for code, (ch_name, en_name, locale) in other_langs:
-        choices.append((f"{ch_name} ({en_name})", code))
-    
-    return choices
+    return list(_LANGUAGE_CHOICES)
 
 
 def get_language_info(code: str) -> tuple:
@@ -135,3 +135,20 @@ def get_edge_tts_voice(lang_code: str) -> str:
     """取得對應的 Edge TTS 語音名稱"""
     return EDGE_TTS_VOICES.get(lang_code, "en-US-JennyNeural")
 
+
+# Whisper 語言代碼對照表（模組層級常數，不在每次辨識時重建 dict）
+WHISPER_LANG_MAP = {
+    "zh_TW": "zh", "zh_CN": "zh",
+    "en_US": "en", "ja_JP": "ja", "ko_KR": "ko",
+    "de_DE": "de", "fr_FR": "fr", "es_ES": "es",
+    "it_IT": "it", "ru_RU": "ru", "pt_BR": "pt",
+    "vi_VN": "vi", "th_TH": "th", "ar_SA": "ar",
+}
+
+
+def get_whisper_lang(lang_code: str):
+    """取得 Whisper 語言代碼（"auto" 或未知代碼回傳 None 讓模型自動偵測）"""
+    if lang_code == "auto":
+        return None
+    return WHISPER_LANG_MAP.get(lang_code, None)
+
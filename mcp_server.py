@@ -1,6 +1,8 @@
 from mcp.server.fastmcp import FastMCP
 import os
 import sys
+import threading
+from collections import deque
 
 # Add current directory to path to import modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -12,6 +14,10 @@ from history import history_manager
 # Initialize FastMCP Server
 mcp = FastMCP("TranslateGemma")
 
+# Warm the Whisper model in the background while the server boots, so the
+# first dub_video call doesn't pay the multi-second cold-load latency.
+threading.Thread(target=video_dubber._get_whisper_model, daemon=True).start()
+
 @mcp.tool()
 def translate_text(text: str, source_lang: str = "auto", target_lang: str = "zh_TW") -> str:
     """
@@ -49,10 +55,11 @@ def translate_image(image_path: str, source_lang: str = "auto", target_lang: str
     if not os.path.exists(image_path):
         return f"Error: File {image_path} not found."
     
-    full_result = ""
-    # translate_image is a generator
-    for chunk in translator.translate_image(image_path, target_lang, source_lang):
-        full_result = chunk
+    # translate_image yields cumulative progress strings (each yield contains
+    # the full text so far), so only the final item matters; deque(maxlen=1)
+    # exhausts the generator at C speed instead of a Python-level loop.
+    last = deque(translator.translate_image(image_path, target_lang, source_lang), maxlen=1)
+    full_result = last[0] if last else ""
         
     # Log to history
     history_manager.add_history(
@@ -9,10 +9,15 @@
 """
 
 import os
+import re
 import tempfile
+import threading
 import subprocess
 from typing import Optional, Generator
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from languages import get_whisper_lang
 
 # ========== 資料類別 ==========
 
@@ -36,22 +41,27 @@ class MeetingSummaryResult:
 
 # ========== 摘要類型定義 ==========
 
+# num_predict 依類型調整：條列類輸出短、完整摘要長，不一律保留 2048
 SUMMARY_TYPES = {
     "key_points": {
         "name": "📝 會議重點",
-        "prompt": "請整理這份會議逐字稿的重點摘要，用條列式呈現主要討論內容。"
+        "prompt": "請整理這份會議逐字稿的重點摘要，用條列式呈現主要討論內容。",
+        "num_predict": 1024
     },
     "action_items": {
         "name": "✅ 待辦事項",
-        "prompt": "請從會議逐字稿中提取所有待辦事項（Action Items），列出負責人（如有提及）和截止日期（如有提及）。"
+        "prompt": "請從會議逐字稿中提取所有待辦事項（Action Items），列出負責人（如有提及）和截止日期（如有提及）。",
+        "num_predict": 1024
     },
     "decisions": {
         "name": "📋 決議事項",
-        "prompt": "請從會議逐字稿中提取所有達成的決議和共識。"
+        "prompt": "請從會議逐字稿中提取所有達成的決議和共識。",
+        "num_predict": 1024
     },
     "full_summary": {
         "name": "📄 完整摘要",
-        "prompt": "請為這份會議逐字稿撰寫一份完整的會議摘要，包含：會議主題、參與討論的重點、主要決議、以及後續行動事項。"
+        "prompt": "請為這份會議逐字稿撰寫一份完整的會議摘要，包含：會議主題、參與討論的重點、主要決議、以及後續行動事項。",
+        "num_predict": 2048
     }
 }
 
@@ -77,13 +87,47 @@ class MeetingSummarizer:
         self.ollama_model = ollama_model
         self.gemini_api_key = gemini_api_key
         self._whisper_model = None
+        self._whisper_batched = False
+        self._ollama_client = None
+        self._gemini_model = None
+
+    def _get_ollama_client(self):
+        """延遲建立並重用 Ollama client（HTTP 連線 keep-alive，不每次重建）"""
+        if self._ollama_client is None:
+            import ollama
+            self._ollama_client = ollama.Client()
+        return self._ollama_client
+
+    def _get_gemini_model(self):
+        """延遲配置並重用 Gemini 模型 handle（不每次 configure/重建）"""
+        if self._gemini_model is None:
+            import google.generativeai as genai
+            genai.configure(api_key=self.gemini_api_key)
+            self._gemini_model = genai.GenerativeModel("gemini-2.0-flash")
+        return self._gemini_model
     
+    # 批次推理的 batch 大小（僅 BatchedInferencePipeline 可用時生效）
+    WHISPER_BATCH_SIZE = 16
+
     def _get_whisper_model(self):
-        """延遲載入 Whisper 模型"""
+        """延遲載入 Whisper 模型（裝置自動偵測 + 可用時包批次推理）"""
         if self._whisper_model is None:
-            from faster_whisper import WhisperModel
-            # 使用 base 模型，平衡速度與準確度
-            self._whisper_model = WhisperModel("base", device="cpu", compute_type="int8")
+            from translator import get_whisper_model
+
+            # 模型大小由 TG_WHISPER_MODEL 統一決定（預設 base），共用跨服務的
+            # 模型快取；裝置/精度交給工廠偵測：CUDA 用 int8_float16、CPU 用 int8
+            model = get_whisper_model()
+
+            # 有 BatchedInferencePipeline（faster-whisper >= 1.0）就包起來，
+            # 長音訊可平行解碼多個分段
+            try:
+                from faster_whisper import BatchedInferencePipeline
+                self._whisper_model = BatchedInferencePipeline(model=model)
+                self._whisper_batched = True
+            except ImportError:
+                self._whisper_model = model
+                self._whisper_batched = False
+
         return self._whisper_model
     
     # ========== 音訊抽取 ==========
@@ -94,8 +138,10 @@ class MeetingSummarizer:
         
         Args:
             video_path: 影片檔案路徑
-            output_dir: 輸出目錄（預設使用暫存目錄）
-            
+            output_dir: 輸出目錄；呼叫端負責清理，建議傳入
+                tempfile.TemporaryDirectory 管理的路徑
+                （未提供時退回 mkdtemp，目錄會留給呼叫端處理）
+
         Returns:
             音訊檔案路徑 (WAV 格式)
         """
@@ -122,6 +168,34 @@ class MeetingSummarizer:
             return audio_path
         except subprocess.CalledProcessError as e:
             raise RuntimeError(f"音訊抽取失敗: {e.stderr.decode()}")
+
+    def _decode_audio(self, video_path: str):
+        """ffmpeg 直接解碼成 16kHz mono PCM 進記憶體，不落地 WAV 暫存檔
+
+        faster-whisper 可直接吃 float32 ndarray，省掉「寫檔→再讀檔」
+        一來一回的磁碟 I/O 與暫存目錄清理。
+
+        Returns:
+            np.ndarray: float32 音訊（值域 [-1, 1]）
+        """
+        import numpy as np
+
+        cmd = [
+            "ffmpeg",
+            "-i", video_path,
+            "-vn",
+            "-f", "s16le",
+            "-acodec", "pcm_s16le",
+            "-ar", "16000",
+            "-ac", "1",
+            "pipe:1"
+        ]
+
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if proc.returncode != 0:
+            raise RuntimeError(f"音訊解碼失敗: {proc.stderr.decode(errors='ignore')}")
+
+        return np.frombuffer(proc.stdout, dtype=np.int16).astype(np.float32) / 32768.0
     
     # ========== 語音辨識 ==========
     
@@ -138,29 +212,11 @@ class MeetingSummarizer:
         Returns:
             (segments, detected_language)
         """
-        model = self._get_whisper_model()
-        
-        # 語言對應
-        whisper_lang_map = {
-            "zh_TW": "zh", "zh_CN": "zh",
-            "en_US": "en", "ja_JP": "ja", "ko_KR": "ko",
-            "de_DE": "de", "fr_FR": "fr", "es_ES": "es",
-            "it_IT": "it", "ru_RU": "ru", "pt_BR": "pt",
-            "vi_VN": "vi", "th_TH": "th", "ar_SA": "ar",
-        }
-        
-        lang_code = None if language == "auto" else whisper_lang_map.get(language, None)
-        
         if progress_callback:
             progress_callback("🎙️ 正在進行語音辨識...")
-        
-        # 執行辨識
-        segments_iter, info = model.transcribe(
-            audio_path, 
-            language=lang_code,
-            word_timestamps=False
-        )
-        
+
+        segments_iter, info = self._transcribe_iter(audio_path, language)
+
         # 收集片段
         segments = []
         for seg in segments_iter:
@@ -169,8 +225,43 @@ class MeetingSummarizer:
                 end=seg.end,
                 text=seg.text.strip()
             ))
-        
+
         return segments, info.language
+
+    def _transcribe_iter(self, audio, language: str = "auto"):
+        """啟動語音辨識並回傳惰性片段疊代器（不物化 list）
+
+        Args:
+            audio: 音訊檔路徑或 16kHz float32 ndarray
+
+        Returns:
+            (segments_iter, info)
+        """
+        model = self._get_whisper_model()
+        kwargs = {"language": get_whisper_lang(language), "word_timestamps": False}
+        if self._whisper_batched:
+            kwargs["batch_size"] = self.WHISPER_BATCH_SIZE
+        return model.transcribe(audio, **kwargs)
+
+    def _consume_segments(self, segments_iter) -> tuple[str, str, float]:
+        """單趟走訪 Whisper 片段，一次產出兩種逐字稿與總時長
+
+        取代「先物化 list、再讓 format_transcript 走兩遍」的路徑。
+
+        Returns:
+            (transcript, transcript_with_time, duration)
+        """
+        plain_lines = []
+        timed_lines = []
+        last_end = 0.0
+
+        for seg in segments_iter:
+            text = seg.text.strip()
+            plain_lines.append(text)
+            timed_lines.append(f"[{self._format_time(seg.start)}] {text}")
+            last_end = seg.end
+
+        return "\n".join(plain_lines), "\n".join(timed_lines), last_end
     
     def format_transcript(self, segments: list[TranscriptSegment], 
                           with_timestamps: bool = True) -> str:
@@ -181,26 +272,32 @@ class MeetingSummarizer:
             segments: 逐字稿片段列表
             with_timestamps: 是否包含時間戳
         """
+        if not with_timestamps:
+            return "\n".join(seg.text for seg in segments)
+
+        # 格式只挑一次（超過一小時才帶 HH），迴圈內只剩 divmod + str.format
+        has_hours = bool(segments) and segments[-1].end >= 3600
+        fmt = "[{:02d}:{:02d}:{:02d}] {}" if has_hours else "[{:02d}:{:02d}] {}"
+
         lines = []
         for seg in segments:
-            if with_timestamps:
-                start_time = self._format_time(seg.start)
-                lines.append(f"[{start_time}] {seg.text}")
+            minutes, secs = divmod(int(seg.start), 60)
+            hours, minutes = divmod(minutes, 60)
+            if has_hours:
+                lines.append(fmt.format(hours, minutes, secs, seg.text))
             else:
-                lines.append(seg.text)
-        
+                lines.append(fmt.format(minutes, secs, seg.text))
+
         return "\n".join(lines)
-    
+
     def _format_time(self, seconds: float) -> str:
         """格式化時間為 HH:MM:SS"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        
+        minutes, secs = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+
         if hours > 0:
             return f"{hours:02d}:{minutes:02d}:{secs:02d}"
-        else:
-            return f"{minutes:02d}:{secs:02d}"
+        return f"{minutes:02d}:{secs:02d}"
     
     # ========== AI 摘要生成 ==========
     
@@ -221,91 +318,172 @@ class MeetingSummarizer:
             return self._generate_summary_gemini(transcript, summary_types, progress_callback)
         else:
             return self._generate_summary_ollama(transcript, summary_types, progress_callback)
-    
-    def _generate_summary_ollama(self, transcript: str, summary_types: list[str],
-                                  progress_callback=None) -> dict:
-        """使用 Ollama 生成摘要"""
-        import ollama
-        
-        results = {}
-        
-        for i, summary_type in enumerate(summary_types):
-            if summary_type not in SUMMARY_TYPES:
-                continue
-            
-            type_info = SUMMARY_TYPES[summary_type]
-            
-            if progress_callback:
-                progress_callback(f"🤖 正在生成 {type_info['name']} ({i+1}/{len(summary_types)})...")
-            
-            # 構建 prompt
-            prompt = f"""你是一位專業的會議記錄整理助手。以下是一份會議的逐字稿：
+
+    def _build_prompt(self, transcript: str, instruction: str) -> str:
+        """構建摘要 prompt（逐字稿在前、指令在後）"""
+        return f"""你是一位專業的會議記錄整理助手。以下是一份會議的逐字稿：
 
 ---
 {transcript}
 ---
 
-{type_info['prompt']}
+{instruction}
 
 請用繁體中文回答，格式清晰、條理分明。"""
 
+    def _build_combined_prompt(self, transcript: str, summary_types: list[str]) -> str:
+        """把多種摘要類型合併成單一 prompt（逐字稿只送一次）"""
+        sections = "\n\n".join(
+            f"### {st} ###\n{SUMMARY_TYPES[st]['prompt']}" for st in summary_types)
+        instruction = (
+            "請依序完成下列各項整理，輸出時每一項都必須以對應的 `### 標記 ###` "
+            f"單獨一行開頭：\n\n{sections}")
+        return self._build_prompt(transcript, instruction)
+
+    def _parse_combined_response(self, content: str, summary_types: list[str]):
+        """依 ### key ### 分隔線拆回各摘要；缺任何一段視為解析失敗回傳 None"""
+        parts = re.split(r'###\s*(\w+)\s*###', content)
+        parsed = {}
+        for i in range(1, len(parts) - 1, 2):
+            parsed[parts[i]] = parts[i + 1].strip()
+
+        if all(st in parsed for st in summary_types):
+            return {st: parsed[st] for st in summary_types}
+        return None
+
+    # num_ctx 依逐字稿長度動態挑選的上下限：太小會默默截斷、太大浪費 KV 記憶體
+    OLLAMA_NUM_CTX_MIN = 4096
+    OLLAMA_NUM_CTX_MAX = 32768
+    # 連續生成多種摘要時模型留在記憶體，不重新載入
+    OLLAMA_KEEP_ALIVE = "10m"
+
+    def _ctx_for(self, prompt: str) -> int:
+        """依 prompt 長度挑 num_ctx（向上取 2 的冪）
+
+        以 3 字元/token 粗估（對中文偏保守），再留 512 token 餘裕。
+        """
+        est_tokens = len(prompt) // 3 + 512
+        ctx = 1 << est_tokens.bit_length()
+        return min(max(ctx, self.OLLAMA_NUM_CTX_MIN), self.OLLAMA_NUM_CTX_MAX)
+
+    def _run_summaries(self, transcript: str, summary_types: list[str], invoke_fn,
+                       progress_callback=None, parallel: bool = True,
+                       prompt_fn=None) -> dict:
+        """共用的摘要生成核心（兩個後端都走這裡）
+
+        先嘗試把多種類型合併成單一呼叫（逐字稿只被 prompt-process 一次），
+        模型沒照格式輸出才退回逐類型生成。
+
+        Args:
+            invoke_fn: (prompt, num_predict) -> str，由各後端提供
+            parallel: 逐類型 fallback 是否平行送出
+            prompt_fn: (i, summary_type) -> str，預設為逐字稿前綴 + 類型指令
+        """
+        valid_types = [st for st in summary_types if st in SUMMARY_TYPES]
+        if not valid_types:
+            return {}
+
+        if len(valid_types) > 1:
+            if progress_callback:
+                progress_callback(f"🤖 正在生成 {len(valid_types)} 種摘要（合併請求）...")
             try:
-                response = ollama.chat(
-                    model=self.ollama_model,
-                    messages=[{"role": "user", "content": prompt}],
-                    options={"num_predict": 2048}
-                )
-                results[summary_type] = response['message']['content']
-            except Exception as e:
-                results[summary_type] = f"❌ 生成失敗: {str(e)}"
-        
+                content = invoke_fn(
+                    self._build_combined_prompt(transcript, valid_types),
+                    sum(SUMMARY_TYPES[st].get("num_predict", 2048) for st in valid_types))
+                parsed = self._parse_combined_response(content, valid_types)
+                if parsed is not None:
+                    return parsed
+            except Exception:
+                pass  # 退回逐類型生成
+
+        if prompt_fn is None:
+            # 逐字稿放前綴、指令放尾端：prompt 前綴逐類型間 byte-identical，
+            # 伺服器端可命中 KV cache，只處理短指令
+            def prompt_fn(i, summary_type):
+                return self._build_prompt(transcript, SUMMARY_TYPES[summary_type]['prompt'])
+
+        # dict.fromkeys 先固定插入順序，as_completed 亂序完成也不影響輸出排序
+        results = dict.fromkeys(valid_types)
+
+        if parallel and len(valid_types) > 1:
+            # 各摘要類型互相獨立、都是網路等待，平行送出（HTTP 等待時釋放 GIL）
+            with ThreadPoolExecutor(max_workers=min(len(valid_types), 4)) as pool:
+                futures = {pool.submit(invoke_fn, prompt_fn(i, st),
+                                       SUMMARY_TYPES[st].get("num_predict", 2048)): st
+                           for i, st in enumerate(valid_types)}
+                done = 0
+                for future in as_completed(futures):
+                    summary_type = futures[future]
+                    done += 1
+                    try:
+                        results[summary_type] = future.result()
+                    except Exception as e:
+                        results[summary_type] = f"❌ 生成失敗: {str(e)}"
+                    if progress_callback:
+                        type_name = SUMMARY_TYPES[summary_type]['name']
+                        progress_callback(f"🤖 已完成 {type_name} ({done}/{len(valid_types)})...")
+        else:
+            for i, summary_type in enumerate(valid_types):
+                if progress_callback:
+                    type_name = SUMMARY_TYPES[summary_type]['name']
+                    progress_callback(f"🤖 正在生成 {type_name} ({i+1}/{len(valid_types)})...")
+                try:
+                    results[summary_type] = invoke_fn(
+                        prompt_fn(i, summary_type),
+                        SUMMARY_TYPES[summary_type].get("num_predict", 2048))
+                except Exception as e:
+                    results[summary_type] = f"❌ 生成失敗: {str(e)}"
+
         return results
-    
+
+    def _generate_summary_ollama(self, transcript: str, summary_types: list[str],
+                                  progress_callback=None) -> dict:
+        """使用 Ollama 生成摘要"""
+        client = self._get_ollama_client()
+
+        def invoke(prompt, num_predict):
+            response = client.chat(
+                model=self.ollama_model,
+                messages=[{"role": "user", "content": prompt}],
+                options={"num_predict": num_predict,
+                         "num_ctx": self._ctx_for(prompt),
+                         "temperature": 0.3},
+                keep_alive=self.OLLAMA_KEEP_ALIVE
+            )
+            return response['message']['content']
+
+        return self._run_summaries(transcript, summary_types, invoke, progress_callback)
+
     def _generate_summary_gemini(self, transcript: str, summary_types: list[str],
                                   progress_callback=None) -> dict:
         """使用 Gemini API 生成摘要"""
         try:
             import google.generativeai as genai
         except ImportError:
-            return {st: "❌ 請安裝 google-generativeai: pip install google-generativeai" 
+            return {st: "❌ 請安裝 google-generativeai: pip install google-generativeai"
                     for st in summary_types}
-        
+
         if not self.gemini_api_key:
             return {st: "❌ 請提供 Gemini API Key" for st in summary_types}
-        
-        # 配置 Gemini
-        genai.configure(api_key=self.gemini_api_key)
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        
-        results = {}
-        
-        for i, summary_type in enumerate(summary_types):
-            if summary_type not in SUMMARY_TYPES:
-                continue
-            
-            type_info = SUMMARY_TYPES[summary_type]
-            
-            if progress_callback:
-                progress_callback(f"🤖 正在生成 {type_info['name']} ({i+1}/{len(summary_types)})...")
-            
-            # 構建 prompt
-            prompt = f"""你是一位專業的會議記錄整理助手。以下是一份會議的逐字稿：
 
----
-{transcript}
----
+        model = self._get_gemini_model()
 
-{type_info['prompt']}
+        # 用同一個 chat session：逐字稿只在第一則訊息送出，
+        # 後續類型只補短指令，SDK 維護歷史（context 不重送）。
+        # 因為訊息有順序相依，fallback 走循序而非平行
+        chat = model.start_chat()
 
-請用繁體中文回答，格式清晰、條理分明。"""
+        def invoke(prompt, num_predict):
+            return chat.send_message(prompt).text
 
-            try:
-                response = model.generate_content(prompt)
-                results[summary_type] = response.text
-            except Exception as e:
-                results[summary_type] = f"❌ 生成失敗: {str(e)}"
-        
-        return results
+        def prompt_fn(i, summary_type):
+            if i == 0:
+                return self._build_prompt(transcript, SUMMARY_TYPES[summary_type]['prompt'])
+            return (f"{SUMMARY_TYPES[summary_type]['prompt']}\n\n"
+                    "請用繁體中文回答，格式清晰、條理分明。")
+
+        return self._run_summaries(transcript, summary_types, invoke, progress_callback,
+                                   parallel=False, prompt_fn=prompt_fn)
     
     # ========== 完整處理流程 ==========
     
@@ -328,38 +506,30 @@ class MeetingSummarizer:
         if summary_types is None:
             summary_types = ["full_summary"]
         
-        # 1. 抽取音訊
+        # 1. 解碼音訊（直接進記憶體，不寫暫存 WAV）
+        # Whisper 冷載入要數秒且與解碼互相獨立，兩個階段重疊進行
         if progress_callback:
-            progress_callback("🎬 正在從影片抽取音訊...")
-        
-        audio_path = self.extract_audio(video_path)
-        
-        # 2. 語音辨識
+            progress_callback("🎬 正在從影片解碼音訊...")
+
+        warmup = threading.Thread(target=self._get_whisper_model, daemon=True)
+        warmup.start()
+        audio = self._decode_audio(video_path)
+        warmup.join()
+
+        # 2. 語音辨識（單趟走訪片段，同時產出兩種逐字稿與時長）
         if progress_callback:
             progress_callback("🎙️ 正在進行語音辨識...")
-        
-        segments, detected_lang = self.transcribe(audio_path, language, progress_callback)
-        
-        # 格式化逐字稿
-        transcript = self.format_transcript(segments, with_timestamps=False)
-        transcript_with_time = self.format_transcript(segments, with_timestamps=True)
-        
-        # 計算時長
-        duration = segments[-1].end if segments else 0.0
+
+        segments_iter, info = self._transcribe_iter(audio, language)
+        transcript, transcript_with_time, duration = self._consume_segments(segments_iter)
+        detected_lang = info.language
         
         # 3. 生成摘要
         if progress_callback:
             progress_callback("🤖 正在生成會議摘要...")
         
         summary = self.generate_summary(transcript, summary_types, progress_callback)
-        
-        # 4. 清理暫存檔案
-        try:
-            os.remove(audio_path)
-            os.rmdir(os.path.dirname(audio_path))
-        except:
-            pass
-        
+
         return MeetingSummaryResult(
             transcript=transcript,
             transcript_with_time=transcript_with_time,
@@ -381,18 +551,44 @@ class MeetingSummarizer:
         if summary_types is None:
             summary_types = ["full_summary"]
         
-        # Stage 1: 抽取音訊
-        yield {"stage": "extract_audio", "progress": 0.1, "message": "🎬 正在從影片抽取音訊..."}
-        audio_path = self.extract_audio(video_path)
-        yield {"stage": "extract_audio", "progress": 0.2, "message": "✅ 音訊抽取完成"}
-        
-        # Stage 2: 語音辨識
+        # Stage 1: 解碼音訊（直接進記憶體，不寫暫存 WAV）
+        # Whisper 冷載入與解碼重疊進行
+        yield {"stage": "extract_audio", "progress": 0.1, "message": "🎬 正在從影片解碼音訊..."}
+        warmup = threading.Thread(target=self._get_whisper_model, daemon=True)
+        warmup.start()
+        audio = self._decode_audio(video_path)
+        warmup.join()
+        yield {"stage": "extract_audio", "progress": 0.2, "message": "✅ 音訊解碼完成"}
+
+        # Stage 2: 語音辨識——逐片段 yield，UI 不用等整段音訊解碼完
         yield {"stage": "transcribe", "progress": 0.3, "message": "🎙️ 正在進行語音辨識..."}
-        segments, detected_lang = self.transcribe(audio_path, language)
-        
-        transcript = self.format_transcript(segments, with_timestamps=False)
-        transcript_with_time = self.format_transcript(segments, with_timestamps=True)
-        duration = segments[-1].end if segments else 0.0
+        segments_iter, info = self._transcribe_iter(audio, language)
+        total_duration = info.duration or 0.0
+
+        plain_lines = []
+        timed_lines = []
+        last_end = 0.0
+
+        for seg in segments_iter:
+            text = seg.text.strip()
+            plain_lines.append(text)
+            timed_lines.append(f"[{self._format_time(seg.start)}] {text}")
+            last_end = seg.end
+
+            ratio = min(last_end / total_duration, 1.0) if total_duration else 0.0
+            yield {
+                "stage": "transcribe",
+                # 辨識階段對應整體進度 0.3 → 0.5
+                "progress": 0.3 + 0.2 * ratio,
+                "message": f"🎙️ 語音辨識中... ({self._format_time(last_end)}/{self._format_time(total_duration)})",
+                "partial_text": text,
+                "start": seg.start
+            }
+
+        transcript = "\n".join(plain_lines)
+        transcript_with_time = "\n".join(timed_lines)
+        duration = last_end
+        detected_lang = info.language
         
         yield {
             "stage": "transcribe", 
@@ -423,13 +619,6 @@ class MeetingSummarizer:
                 "partial_summary": {summary_type: partial_summary.get(summary_type, "")}
             }
         
-        # 清理
-        try:
-            os.remove(audio_path)
-            os.rmdir(os.path.dirname(audio_path))
-        except:
-            pass
-        
         yield {
             "stage": "done",
             "progress": 1.0,
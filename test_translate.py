@@ -37,13 +37,12 @@ LANGUAGES = {
 
 
 def show_languages():
-    """顯示語言選擇選單"""
-    print("\n" + "=" * 50)
-    print("【語言選擇】")
-    print("=" * 50)
-    for key, (ch_name, en_name, code) in LANGUAGES.items():
-        print(f"  {key:>2}. {ch_name} ({en_name})")
-    print("=" * 50)
+    """顯示語言選擇選單（組成單一字串一次輸出，不逐行 print）"""
+    lines = ["\n" + "=" * 50, "【語言選擇】", "=" * 50]
+    lines.extend(f"  {key:>2}. {ch_name} ({en_name})"
+                 for key, (ch_name, en_name, code) in LANGUAGES.items())
+    lines.append("=" * 50)
+    print("\n".join(lines))
 
 
 def get_prompt(text: str, source_lang: tuple, target_lang: tuple) -> str:
@@ -4,28 +4,135 @@ TranslateGemma 翻譯服務核心
 透過 Ollama 呼叫 TranslateGemma 模型進行翻譯
 """
 
+import functools
+import hashlib
+import os
+import queue
+import re
+import tempfile
+import threading
 import ollama
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Generator, Optional
-from languages import LANGUAGES, get_language_info
+from languages import LANGUAGES, get_language_info, get_whisper_lang
 
+# 翻譯記憶快取上限（LFU：常見片語跨 session 重複出現時保留）
+TRANSLATE_CACHE_MAXSIZE = 10_000
 
-class TranslateGemmaService:
-    """TranslateGemma 翻譯服務"""
-    
-    def __init__(self, model_name: str = "translategemma"):
-        self.model_name = model_name
-    
-    def _build_prompt(self, text: str, source_code: str, target_code: str) -> str:
-        """建構翻譯 prompt"""
-        src_info = get_language_info(source_code)
-        tgt_info = get_language_info(target_code)
-        
-        src_name, src_en, src_locale = src_info
-        tgt_name, tgt_en, tgt_locale = tgt_info
-        
-        # 繁體中文特殊處理
-        if target_code == "zh_TW":
-            prompt = f"""You are a professional {src_en} ({src_locale}) to Traditional Chinese (Taiwan) translator.
+# 單次生成的輸出 token 上限（防止 runaway generation 長時間佔住平行槽）
+TRANSLATE_NUM_PREDICT_MAX = 2048
+
+# Ollama 伺服器端平行度：沒設的話併發請求會在伺服器端排隊序列化。
+# 此設定需在 ollama serve 啟動前生效——setdefault 照顧由本行程（或其
+# 子行程）帶起伺服器的情境；已獨立運行的伺服器請在其環境中設定同名變數。
+# 另建議在伺服器環境設 OLLAMA_MAX_LOADED_MODELS >= 2，翻譯模型才不會
+# 與其他常駐模型互相逐出。
+os.environ.setdefault("OLLAMA_NUM_PARALLEL", "8")
+
+# 每次請求都帶 keep_alive，把模型釘在 RAM/VRAM（預設閒置 5 分鐘就卸載，
+# 陣發性的翻譯流量會反覆吃到重載成本）
+OLLAMA_KEEP_ALIVE = "1h"
+
+# Whisper 模型大小（速度/準確度權衡）。預設 base；GPU 機器可設
+# TG_WHISPER_MODEL=distil-large-v3（或 large-v3-turbo）換大幅準確度提升，
+# 蒸餾/turbo 版的推理速度仍接近 small 等級。
+WHISPER_MODEL_SIZE = os.environ.get("TG_WHISPER_MODEL", "base")
+
+
+# TTS 結果以內容雜湊落地快取：同樣的 (語音, 文字) 跨 session 直接重用檔案，
+# 不重打 Edge TTS；檔名穩定（不像 id() 是記憶體位址）才能命中
+TTS_CACHE_DIR = os.path.join(tempfile.gettempdir(), "transgemma_tts")
+TTS_CACHE_MAXFILES = 512
+
+# 翻譯結果的落地快取（LFU 之下的第二層）：重看同部影片、重翻同份文件時
+# 跨行程命中，不重跑模型。與 history.db 同樣放在工作目錄
+TRANSLATE_CACHE_DB = "translation_cache.db"
+
+
+def tts_cache_path(voice: str, text: str) -> str:
+    """以 (語音, 文字) 的內容雜湊決定快取檔路徑（檔案存在即可直接重用）"""
+    os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+    key = hashlib.blake2b(f"{voice}\0{text}".encode(), digest_size=12).hexdigest()
+    return os.path.join(TTS_CACHE_DIR, f"tts_{key}.mp3")
+
+
+# 在途的配音工作數：任何工作還沒合併完，就不能修剪快取——
+# 一支長片的片段數可遠超 TTS_CACHE_MAXFILES，別的工作收尾時修剪
+# 會把在途工作已合成、尚未讀取的片段檔淘汰掉
+_tts_jobs_lock = threading.Lock()
+_tts_active_jobs = 0
+
+
+def tts_job_started():
+    """標記一個依賴 TTS 快取檔的工作開始（配音 pipeline 進入點呼叫）"""
+    global _tts_active_jobs
+    with _tts_jobs_lock:
+        _tts_active_jobs += 1
+
+
+def tts_job_finished():
+    """工作收尾；最後一個在途工作結束時才修剪快取"""
+    global _tts_active_jobs
+    with _tts_jobs_lock:
+        _tts_active_jobs -= 1
+        idle = _tts_active_jobs == 0
+    if idle:
+        trim_tts_cache()
+
+
+def trim_tts_cache(max_files: int = TTS_CACHE_MAXFILES):
+    """快取檔數超過上限時，淘汰最久未被存取的檔案
+
+    只在工作結束的邊界呼叫：長片一次配音可產生數千個片段，若每存一檔
+    就修剪，進行中工作的前段檔案會在合併讀取前被淘汰掉。
+    有任何工作在途時直接略過，延到最後一個工作收尾再修。
+    """
+    with _tts_jobs_lock:
+        if _tts_active_jobs > 0:
+            return
+    try:
+        entries = [os.path.join(TTS_CACHE_DIR, name) for name in os.listdir(TTS_CACHE_DIR)]
+        if len(entries) <= max_files:
+            return
+        entries.sort(key=lambda path: os.stat(path).st_atime)
+        for path in entries[:len(entries) - max_files]:
+            os.remove(path)
+    except OSError:
+        pass
+
+
+async def save_tts_to_cache(communicate, output_path: str):
+    """把 edge-tts 輸出原子性地寫進快取路徑
+
+    先寫同目錄的暫存檔再 os.replace 換入：中途失敗不會在最終路徑留下
+    截斷檔被後續誤判為命中；多個 worker 同時合成相同文字時，rename 是
+    原子操作，最終路徑永遠是某份完整檔案。
+    """
+    tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        await communicate.save(tmp_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+@functools.lru_cache(maxsize=256)
+def _prompt_prefix(source_code: str, target_code: str) -> str:
+    """翻譯 prompt 的固定前綴（不含待翻文字）
+
+    每個 (來源, 目標) 組合只格式化一次；前綴逐位元組穩定也讓
+    Ollama 的 KV cache 能跨請求重用。
+    """
+    src_name, src_en, src_locale = get_language_info(source_code)
+    tgt_name, tgt_en, tgt_locale = get_language_info(target_code)
+
+    # 繁體中文特殊處理
+    if target_code == "zh_TW":
+        return f"""You are a professional {src_en} ({src_locale}) to Traditional Chinese (Taiwan) translator.
 
 IMPORTANT RULES:
 1. You MUST output ONLY Traditional Chinese characters (繁體字) as used in Taiwan.
@@ -43,36 +150,295 @@ Please provide ONLY the Traditional Chinese translation without any additional e
 
 Translate the following text:
 
-{text}"""
-        else:
-            prompt = f"""You are a professional {src_en} ({src_locale}) to {tgt_en} ({tgt_locale}) translator.
-Your goal is to accurately convey the meaning and nuances of the original {src_en} text 
+"""
+
+    return f"""You are a professional {src_en} ({src_locale}) to {tgt_en} ({tgt_locale}) translator.
+Your goal is to accurately convey the meaning and nuances of the original {src_en} text
 while adhering to {tgt_en} grammar, style, and conventions.
 
 Please provide ONLY the {tgt_en} translation without any additional explanations or commentary.
 
 Translate the following text:
 
-{text}"""
-        
-        return prompt
-    
+"""
+
+
+def _detect_whisper_device() -> tuple:
+    """偵測 Whisper 推理裝置：有 CUDA 用 int8_float16，否則 CPU int8"""
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return "cuda", "int8_float16"
+    except ImportError:
+        pass
+    return "cpu", "int8"
+
+
+@functools.lru_cache(maxsize=4)
+def _load_whisper_model(model_size: str, device: str, compute_type: str):
+    from faster_whisper import WhisperModel
+    # ASR 在 CPU 上吃記憶體頻寬：int8 權重減半搬運量，CTranslate2 的
+    # intra-op 執行緒開滿核心數，num_workers=2 讓併發轉錄不互相排隊
+    return WhisperModel(
+        model_size,
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=os.cpu_count() or 4,
+        num_workers=2,
+    )
+
+
+def get_whisper_model(model_size: str = None, device: str = None,
+                      compute_type: str = None):
+    """共用的 WhisperModel 工廠
+
+    模型無狀態且載入要讀 ~140MB 權重、初始化 CTranslate2 執行緒，
+    所以跨服務（翻譯語音辨識、影片配音）共用同一實例；
+    未指定大小時採 TG_WHISPER_MODEL（預設 base），未指定裝置時自動偵測 CUDA。
+    """
+    if model_size is None:
+        model_size = WHISPER_MODEL_SIZE
+    if device is None or compute_type is None:
+        detected_device, detected_type = _detect_whisper_device()
+        device = device or detected_device
+        compute_type = compute_type or detected_type
+    try:
+        return _load_whisper_model(model_size, device, compute_type)
+    except Exception:
+        # torch 看得到 CUDA 不代表 CTranslate2 初始化一定成功
+        # （驅動/cuBLAS 版本不合等），退回 CPU 而非整個功能失效
+        if device == "cuda":
+            print("⚠️ Whisper CUDA 初始化失敗，改用 CPU")
+            return _load_whisper_model(model_size, "cpu", "int8")
+        raise
+
+
+class TranslateGemmaService:
+    """TranslateGemma 翻譯服務"""
+
+    def __init__(self, model_name: str = "translategemma"):
+        self.model_name = model_name
+        # (source, target, text) -> [使用次數, 譯文]
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        # 落地快取連線延遲建立（import 時不碰磁碟）
+        self._db = None
+        self._db_lock = threading.Lock()
+        # 延遲建立的持久連線（重複使用 HTTP 連線，省掉每次翻譯的握手成本）
+        self._client = None
+        # 背景預熱：先把模型權重載進 RAM/VRAM，第一個使用者請求不吃冷啟動
+        threading.Thread(target=self._warmup, daemon=True).start()
+
+    def _warmup(self):
+        """對模型發一個 1 token 的請求，強制 Ollama 先載入權重
+
+        失敗（伺服器沒開、模型沒拉）靜默略過，第一次 translate 會回報錯誤。
+        """
+        try:
+            self._get_client().generate(
+                model=self.model_name,
+                prompt="warmup",
+                options={"num_predict": 1},
+                keep_alive=OLLAMA_KEEP_ALIVE
+            )
+        except Exception:
+            pass
+
+    def _get_client(self):
+        """取得共用的 ollama.Client（AsyncClient 綁定 event loop，故不在此持久化）"""
+        if self._client is None:
+            self._client = ollama.Client()
+        return self._client
+
+    def _build_prompt(self, text: str, source_code: str, target_code: str) -> str:
+        """建構翻譯 prompt（固定前綴已快取，每次只做一次字串相接）"""
+        return _prompt_prefix(source_code, target_code) + text
+
+    def _gen_options(self, source_text: str,
+                     cap: int = TRANSLATE_NUM_PREDICT_MAX,
+                     prefix: str = "") -> dict:
+        """推理選項：輸出上限抓原文長度的兩倍（譯文極少更長），低溫度求穩定
+
+        帶 prefix 時以 num_keep 要求伺服器保留固定前綴的 KV cache，
+        同語言對的連續請求不重算 scaffold（token 數以 ~3 字元/token 粗估）。
+        """
+        options = {
+            "num_predict": max(64, min(cap, 2 * len(source_text))),
+            "temperature": 0.1,
+        }
+        if prefix:
+            options["num_keep"] = len(prefix) // 3
+        return options
+
+    def _get_db(self):
+        """取得翻譯落地快取連線（單一常駐連線 + WAL，比照 HistoryManager）"""
+        if self._db is None:
+            import sqlite3
+            conn = sqlite3.connect(TRANSLATE_CACHE_DB, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations "
+                "(key TEXT PRIMARY KEY, result TEXT NOT NULL)"
+            )
+            conn.commit()
+            self._db = conn
+        return self._db
+
+    @staticmethod
+    def _db_key(key) -> str:
+        """(來源, 目標, 文字) 的內容雜湊，讓主鍵索引維持小而固定長度"""
+        source_code, target_code, text = key
+        raw = f"{source_code}\0{target_code}\0{text}".encode()
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+    def _cache_lookup(self, key):
+        """查 LFU 快取並累計使用次數，未命中時查落地快取"""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                entry[0] += 1
+                return entry[1]
+        # 記憶體未命中 → 查 SQLite；命中則升級回 LFU，之後不再碰磁碟
+        try:
+            with self._db_lock:
+                row = self._get_db().execute(
+                    "SELECT result FROM translations WHERE key = ?",
+                    (self._db_key(key),)
+                ).fetchone()
+        except Exception:
+            return None
+        if row is not None:
+            self._cache_store(key, row[0], persist=False)
+            return row[0]
+        return None
+
+    def _cache_store(self, key, value: str, persist: bool = True):
+        """寫入 LFU 快取（滿了淘汰使用次數最少的項目）並同步落地"""
+        with self._cache_lock:
+            if len(self._cache) >= TRANSLATE_CACHE_MAXSIZE:
+                evict_key = min(self._cache, key=lambda k: self._cache[k][0])
+                del self._cache[evict_key]
+            self._cache[key] = [1, value]
+        if persist:
+            try:
+                with self._db_lock:
+                    db = self._get_db()
+                    db.execute(
+                        "INSERT OR REPLACE INTO translations VALUES (?, ?)",
+                        (self._db_key(key), value)
+                    )
+                    db.commit()
+            except Exception:
+                pass  # 落地失敗不影響翻譯結果，下次行程重新計算而已
+
     def translate(self, text: str, source_code: str, target_code: str) -> str:
         """執行翻譯（非串流）"""
         if not text.strip():
             return ""
-        
+
+        # 來源 = 目標語言就不用翻，直接原文返回
+        if source_code == target_code:
+            return text
+
+        # 同樣的 (來源, 目標, 文字) 直接用記憶結果，不重跑模型
+        # 影片字幕常有重複片段，命中率不低
+        key = (source_code, target_code, text)
+        cached = self._cache_lookup(key)
+        if cached is not None:
+            return cached
+
         prompt = self._build_prompt(text, source_code, target_code)
-        
+
         try:
-            response = ollama.chat(
+            # generate（而非 chat）：單輪翻譯不需要對話簿記，
+            # 穩定前綴配 num_keep 讓伺服器跨請求重用 KV cache
+            response = self._get_client().generate(
                 model=self.model_name,
-                messages=[{'role': 'user', 'content': prompt}]
+                prompt=prompt,
+                options=self._gen_options(
+                    text, prefix=_prompt_prefix(source_code, target_code)
+                ),
+                keep_alive=OLLAMA_KEEP_ALIVE
             )
-            return response['message']['content']
+            result = response['response']
+            self._cache_store(key, result)
+            return result
         except Exception as e:
             return f"❌ 翻譯錯誤: {str(e)}"
     
+    def translate_batch(self, texts: list, source_code: str, target_code: str) -> list:
+        """批次翻譯多個片段（單次模型呼叫攤平 per-call 固定成本）
+
+        將多個片段以編號標記打包進同一個 prompt，一次呼叫後再拆回；
+        拆解結果與片段數不符時退回逐句翻譯，確保正確性優先。
+
+        Returns:
+            list: 與 texts 等長的譯文列表
+        """
+        results = [None] * len(texts)
+
+        # 先處理空字串 / 同語言 / 快取命中，只把真正要翻的送模型
+        pending = []  # [(原始索引, 文字)]
+        for i, text in enumerate(texts):
+            if not text.strip():
+                results[i] = ""
+            elif source_code == target_code:
+                results[i] = text
+            else:
+                cached = self._cache_lookup((source_code, target_code, text))
+                if cached is not None:
+                    results[i] = cached
+                else:
+                    pending.append((i, text))
+
+        if not pending:
+            return results
+
+        if len(pending) == 1:
+            idx, text = pending[0]
+            results[idx] = self.translate(text, source_code, target_code)
+            return results
+
+        numbered = "\n".join(f"[{n + 1}] {text}" for n, (_, text) in enumerate(pending))
+        prompt = self._build_prompt(numbered, source_code, target_code)
+        prompt += ("\n\nNote: the text contains numbered segments like [1], [2]. "
+                   "Translate each segment independently and keep the same [n] markers in your output.")
+
+        try:
+            response = self._get_client().generate(
+                model=self.model_name,
+                prompt=prompt,
+                # 批次 prompt 較長，輸出上限放寬到兩倍
+                options=self._gen_options(
+                    numbered, cap=2 * TRANSLATE_NUM_PREDICT_MAX,
+                    prefix=_prompt_prefix(source_code, target_code)
+                ),
+                keep_alive=OLLAMA_KEEP_ALIVE
+            )
+            content = response['response']
+
+            # 依 [n] 標記拆回各片段譯文
+            parts = re.split(r'\[(\d+)\]', content)
+            parsed = {}
+            for j in range(1, len(parts) - 1, 2):
+                parsed[int(parts[j])] = parts[j + 1].strip()
+
+            if len(parsed) != len(pending):
+                raise ValueError("批次譯文片段數與原文不符")
+
+            for n, (idx, text) in enumerate(pending):
+                translated = parsed[n + 1]
+                self._cache_store((source_code, target_code, text), translated)
+                results[idx] = translated
+            return results
+
+        except Exception:
+            # 打包格式沒被模型遵守時退回逐句翻譯
+            for idx, text in pending:
+                results[idx] = self.translate(text, source_code, target_code)
+            return results
+
     def translate_stream(self, text: str, source_code: str, target_code: str) -> Generator[str, None, None]:
         """執行翻譯（串流）"""
         if not text.strip():
@@ -82,89 +448,138 @@ Translate the following text:
         prompt = self._build_prompt(text, source_code, target_code)
         
         try:
-            stream = ollama.chat(
+            stream = self._get_client().generate(
                 model=self.model_name,
-                messages=[{'role': 'user', 'content': prompt}],
-                stream=True
+                prompt=prompt,
+                stream=True,
+                # 串流多用於整頁文件，輸出上限放寬到兩倍
+                options=self._gen_options(
+                    text, cap=2 * TRANSLATE_NUM_PREDICT_MAX,
+                    prefix=_prompt_prefix(source_code, target_code)
+                ),
+                keep_alive=OLLAMA_KEEP_ALIVE
             )
-            
+
             full_response = ""
             for chunk in stream:
-                content = chunk['message']['content']
-                full_response += content
+                full_response += chunk['response']
                 yield full_response
                 
         except Exception as e:
             yield f"❌ 翻譯錯誤: {str(e)}"
     
     def translate_pdf(self, pdf_path: str, target_code: str, source_code: str = "en_US") -> Generator[str, None, None]:
-        """翻譯 PDF 文件（PyMuPDF 提取 + TranslateGemma 翻譯）"""
+        """翻譯 PDF 文件（PyMuPDF 提取 + TranslateGemma 翻譯）
+
+        頁面平行翻譯：同時在途的頁數由 OLLAMA_NUM_PARALLEL 控制，
+        結果仍按頁序輸出（先完成的後頁會暫存，等前頁到齊再一起 yield）。
+        """
         try:
             import fitz  # PyMuPDF
         except ImportError:
             yield "❌ 請安裝 PyMuPDF: pip install PyMuPDF"
             return
-        
+
         tgt_info = get_language_info(target_code)
         tgt_name, tgt_en, tgt_locale = tgt_info
-        
+
         yield "📄 正在讀取 PDF 文件...\n"
-        
+
         try:
             doc = fitz.open(pdf_path)
             total_pages = len(doc)
-            
+
             if total_pages == 0:
                 yield "⚠️ PDF 文件為空或無法讀取"
                 return
-            
+
             yield f"📄 PDF 共 {total_pages} 頁，開始處理...\n\n"
-            
-            all_results = []
-            
-            for page_num in range(total_pages):
-                page = doc[page_num]
-                page_text = page.get_text().strip()
-                
+
+            # 提取與翻譯走 producer/consumer 管線：背景執行緒逐頁提取文字
+            # （PyMuPDF 解析時會釋放 GIL），翻譯不用等整份 PDF 解析完才開始；
+            # 佇列上限 4 頁，提取不會無限超前
+            extract_queue = queue.Queue(maxsize=4)
+            extract_error = []
+
+            def _producer():
+                try:
+                    for i in range(total_pages):
+                        extract_queue.put((i, doc[i].get_text().strip()))
+                except Exception as e:
+                    extract_error.append(e)
+                finally:
+                    extract_queue.put(None)
+                    doc.close()
+
+            threading.Thread(target=_producer, daemon=True).start()
+
+            def translate_page(page_text):
                 if not page_text:
-                    all_results.append(f"【第 {page_num + 1} 頁】\n（無可識別文字）\n")
-                    yield self._format_pdf_results(all_results, page_num + 1, total_pages)
-                    continue
-                
-                # 顯示進度
-                all_results.append(f"【第 {page_num + 1} 頁】\n")
-                yield self._format_pdf_results(all_results, page_num + 1, total_pages, translating=True)
-                
-                # 翻譯這一頁
-                page_translation = ""
-                for result in self.translate_stream(page_text, source_code, target_code):
-                    page_translation = result
-                    current_results = all_results.copy()
-                    current_results[-1] = f"【第 {page_num + 1} 頁】\n{result}\n"
-                    yield self._format_pdf_results(current_results, page_num + 1, total_pages, translating=True)
-                
-                all_results[-1] = f"【第 {page_num + 1} 頁】\n{page_translation}\n"
-                yield self._format_pdf_results(all_results, page_num + 1, total_pages)
-            
-            doc.close()
-            yield self._format_pdf_results(all_results, total_pages, total_pages, done=True)
-            
+                    return None
+                return self.translate(page_text, source_code, target_code)
+
+            # 已完成頁累積成單一字串（frozen prefix），每次 yield 只接 header，
+            # 不重複 join 一整個 list
+            frozen_prefix = ""
+            max_workers = min(
+                total_pages,
+                int(os.environ.get("OLLAMA_NUM_PARALLEL", "8"))
+            )
+
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                page_futures = {}
+                next_page = 0
+                extracting = True
+
+                while next_page < total_pages:
+                    if extracting:
+                        item = extract_queue.get()
+                        if item is None:
+                            extracting = False
+                        else:
+                            i, text = item
+                            page_futures[i] = pool.submit(translate_page, text)
+
+                    # 就緒的前頁依序輸出；提取還在進行時不為未完成的頁停下來
+                    while next_page in page_futures and (
+                            not extracting or page_futures[next_page].done()):
+                        result = page_futures.pop(next_page).result()
+                        if result is None:
+                            piece = f"【第 {next_page + 1} 頁】\n（無可識別文字）\n"
+                        else:
+                            piece = f"【第 {next_page + 1} 頁】\n{result}\n"
+                        frozen_prefix += ("\n" if frozen_prefix else "") + piece
+                        next_page += 1
+                        yield self._format_pdf_results(
+                            frozen_prefix, next_page, total_pages,
+                            translating=next_page < total_pages
+                        )
+
+                    # 提取中斷（錯誤）時後頁不會再來，避免空轉
+                    if not extracting and next_page not in page_futures:
+                        break
+
+            if extract_error:
+                raise extract_error[0]
+
+            yield self._format_pdf_results(frozen_prefix, total_pages, total_pages, done=True)
+
         except FileNotFoundError:
             yield f"❌ 找不到 PDF 文件: {pdf_path}"
         except Exception as e:
             yield f"❌ PDF 處理錯誤: {str(e)}"
     
-    def _format_pdf_results(self, results: list, current_page: int, total_pages: int, 
+    def _format_pdf_results(self, body: str, current_page: int, total_pages: int,
                             translating: bool = False, done: bool = False) -> str:
-        """格式化 PDF 翻譯結果"""
+        """格式化 PDF 翻譯結果（body 為已累積好的頁面字串，這裡只接 header）"""
         if done:
             header = f"✅ 翻譯完成！共 {total_pages} 頁\n{'='*40}\n\n"
         elif translating:
             header = f"🔄 正在翻譯第 {current_page}/{total_pages} 頁...\n{'='*40}\n\n"
         else:
             header = f"📄 已處理 {current_page}/{total_pages} 頁\n{'='*40}\n\n"
-        
-        return header + "\n".join(results)
+
+        return header + body
     
     def translate_image(self, image_path: str, target_code: str, source_code: str = "auto") -> Generator[str, None, None]:
         """翻譯圖片中的文字（Tesseract OCR + TranslateGemma 翻譯）"""
@@ -240,24 +655,15 @@ Translate the following text:
             tuple: (識別文字, 偵測到的語言代碼)
         """
         try:
-            from faster_whisper import WhisperModel
+            import faster_whisper  # noqa: F401
         except ImportError:
             return "❌ 請安裝 faster-whisper: pip install faster-whisper", ""
-        
+
         try:
-            # 使用 base 模型平衡速度與準確度
-            model = WhisperModel("base", device="cpu", compute_type="int8")
-            
-            # 語言對應
-            whisper_lang_map = {
-                "zh_TW": "zh", "zh_CN": "zh",
-                "en_US": "en", "ja_JP": "ja", "ko_KR": "ko",
-                "de_DE": "de", "fr_FR": "fr", "es_ES": "es",
-                "it_IT": "it", "ru_RU": "ru", "pt_BR": "pt",
-                "vi_VN": "vi", "th_TH": "th", "ar_SA": "ar",
-            }
-            
-            lang_code = None if language == "auto" else whisper_lang_map.get(language, None)
+            # 使用 base 模型平衡速度與準確度（共用快取實例，不重複載入）
+            model = get_whisper_model()
+
+            lang_code = get_whisper_lang(language)
             
             segments, info = model.transcribe(audio_path, language=lang_code)
             
@@ -269,6 +675,46 @@ Translate the following text:
         except Exception as e:
             return f"❌ 語音辨識錯誤: {str(e)}", ""
     
+    def speech_to_text_array(self, audio: "np.ndarray", sample_rate: int,
+                             language: str = "auto") -> tuple[str, str]:
+        """將記憶體中的音訊陣列直接交給 faster-whisper，省掉 WAV 檔 round-trip
+
+        Args:
+            audio: float32 音訊資料（值域 [-1, 1]）
+            sample_rate: 取樣率（非 16kHz 會先線性重取樣）
+
+        Returns:
+            tuple: (識別文字, 偵測到的語言代碼)
+        """
+        try:
+            import faster_whisper  # noqa: F401
+            import numpy as np
+        except ImportError:
+            return "❌ 請安裝 faster-whisper: pip install faster-whisper", ""
+
+        try:
+            # Whisper 要求 16kHz float32
+            if sample_rate != 16000:
+                duration = len(audio) / sample_rate
+                target_len = int(duration * 16000)
+                audio = np.interp(
+                    np.linspace(0.0, len(audio), target_len, endpoint=False),
+                    np.arange(len(audio)),
+                    audio
+                ).astype(np.float32)
+
+            model = get_whisper_model()
+
+            lang_code = get_whisper_lang(language)
+
+            segments, info = model.transcribe(audio, language=lang_code)
+
+            text = "".join([segment.text for segment in segments]).strip()
+            return text, info.language
+
+        except Exception as e:
+            return f"❌ 語音辨識錯誤: {str(e)}", ""
+
     async def text_to_speech(self, text: str, language_code: str) -> str:
         """使用 edge-tts 將文字轉為語音
         
@@ -281,8 +727,6 @@ Translate the following text:
         """
         try:
             import edge_tts
-            import tempfile
-            import os
         except ImportError:
             return ""
         
@@ -307,19 +751,40 @@ Translate the following text:
         voice = voice_map.get(language_code, "en-US-JennyNeural")
         
         try:
-            # 建立暫存音檔
-            temp_dir = tempfile.gettempdir()
-            output_path = os.path.join(temp_dir, f"tts_output_{id(text)}.mp3")
-            
+            # 內容雜湊快取：同樣文字 + 語音直接重用既有音檔
+            output_path = tts_cache_path(voice, text)
+            if os.path.exists(output_path):
+                return output_path
+
             communicate = edge_tts.Communicate(text, voice)
-            await communicate.save(output_path)
-            
+            await save_tts_to_cache(communicate, output_path)
+            # 單發 TTS 自成一個工作，存完即是修剪邊界
+            trim_tts_cache()
+
             return output_path
-            
+
         except Exception as e:
             print(f"TTS 錯誤: {e}")
             return ""
 
+    async def text_to_speech_stream(self, text: str, language_code: str):
+        """edge-tts 串流合成：逐塊 yield MP3 bytes，不落地暫存檔
+
+        第一塊音訊產生就能開始播放，省去整檔合成完才回傳的等待。
+        """
+        try:
+            import edge_tts
+        except ImportError:
+            return
+
+        from languages import get_edge_tts_voice
+        voice = get_edge_tts_voice(language_code)
+
+        communicate = edge_tts.Communicate(text, voice)
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                yield chunk["data"]
+
 
 # 單例實例
 translator = TranslateGemmaService()
@@ -11,19 +11,66 @@
 """
 
 import os
+import shutil
 import tempfile
 import subprocess
 import asyncio
+import threading
 import time
 from typing import List, Tuple, Generator, Optional
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import yt_dlp
-from faster_whisper import WhisperModel
+import edge_tts
 
-from translator import translator
+from translator import (translator, get_whisper_model, tts_cache_path,
+                        save_tts_to_cache, tts_job_started, tts_job_finished)
 from languages import get_edge_tts_voice
 
+# 每批打包進單一翻譯請求的片段數（16–32 可塞進模型 context，
+# 批次化把 N 次 HTTP 往返壓成 N/24 次）
+TRANSLATE_BATCH_SIZE = 24
+
+# 燒字幕時偏好的硬體 H.264 編碼器（依平台排序），偵測不到就退回 libx264
+_HW_H264_ENCODERS = ('h264_nvenc', 'h264_videotoolbox', 'h264_qsv', 'h264_amf')
+_h264_encoder = None
+_h264_encoder_lock = threading.Lock()
+
+
+def _detect_h264_encoder() -> str:
+    """探測本機 ffmpeg 可用的 H.264 編碼器（功能探測一次，結果快取）
+
+    NVENC/VideoToolbox 等硬體編碼器比 libx264 快 5–10 倍，
+    燒字幕路徑的重新編碼是僅次於 ASR/翻譯的耗時步驟。
+    光看 -encoders 清單不夠：發行版 ffmpeg 常把 h264_nvenc 編進去
+    但機器沒有對應硬體，要真的編一格畫面成功才算可用。
+    """
+    global _h264_encoder
+    with _h264_encoder_lock:
+        if _h264_encoder is None:
+            encoder = 'libx264'
+            try:
+                listed = subprocess.run(
+                    ['ffmpeg', '-hide_banner', '-encoders'],
+                    capture_output=True, text=True
+                ).stdout
+                for candidate in _HW_H264_ENCODERS:
+                    if candidate not in listed:
+                        continue
+                    probe = subprocess.run([
+                        'ffmpeg', '-hide_banner', '-f', 'lavfi',
+                        '-i', 'nullsrc=s=128x128:d=0.1',
+                        '-frames:v', '1', '-c:v', candidate, '-f', 'null', '-'
+                    ], capture_output=True)
+                    if probe.returncode == 0:
+                        encoder = candidate
+                        break
+            except Exception:
+                pass
+            _h264_encoder = encoder
+        return _h264_encoder
+
 
 @dataclass
 class Segment:
@@ -44,14 +91,32 @@ class VideoDubber:
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir, exist_ok=True)
             
-        self.whisper_model = None
+        self._whisper_pipe = None
+
+        # TTS 專用的常駐 event loop：整個 dubber 生命週期只建一次，
+        # 不在每部影片 new_event_loop/close（epoll 註冊與 asyncio 簿記不便宜），
+        # 批次多語言時各執行緒也共用同一個 loop
+        self._tts_loop = asyncio.new_event_loop()
+        threading.Thread(target=self._tts_loop.run_forever, daemon=True).start()
+
         print(f"VideoDubber initialized with output_dir: {self.output_dir}")
-        
+
+    # 批次推理的 batch 大小（僅 BatchedInferencePipeline 可用時生效）
+    WHISPER_BATCH_SIZE = 16
+
     def _get_whisper_model(self):
-        """延遲載入 Whisper 模型"""
-        if self.whisper_model is None:
-            self.whisper_model = WhisperModel("base", device="cpu", compute_type="int8")
-        return self.whisper_model
+        """延遲載入 Whisper 模型（跨實例 / 跨服務共用，見 translator.get_whisper_model）"""
+        return get_whisper_model()
+
+    def _get_whisper_pipeline(self):
+        """取得批次推理 pipeline（faster-whisper 版本太舊時回傳 None）"""
+        if self._whisper_pipe is None:
+            try:
+                from faster_whisper import BatchedInferencePipeline
+                self._whisper_pipe = BatchedInferencePipeline(model=self._get_whisper_model())
+            except ImportError:
+                self._whisper_pipe = False
+        return self._whisper_pipe or None
     
     def _create_job_dir(self, prefix="job"):
         """建立工作專屬目錄"""
@@ -60,15 +125,15 @@ class VideoDubber:
         os.makedirs(job_dir, exist_ok=True)
         return job_dir
 
-    def download_youtube(self, url: str, output_dir: str, progress_callback=None) -> Tuple[str, str]:
+    def download_youtube(self, url: str, output_dir: str, progress_callback=None) -> str:
         """
         下載 YouTube 影片
-        
+
         Args:
             output_dir: 指定輸出目錄
-            
+
         Returns:
-            (video_path, audio_path)
+            video_path
         """
         # 下載影片
         ydl_opts = {
@@ -77,134 +142,232 @@ class VideoDubber:
             'merge_output_format': 'mp4',
             'quiet': True,
             'no_warnings': True,
+            # DASH/HLS 分段平行抓取：單線 HTTPS 吃不滿頻寬，長片下載
+            # 常是整條流水線的第一個瓶頸
+            'concurrent_fragment_downloads': 8,
         }
-        
+
+        # 有 aria2c 就交給它做多連線分段下載（range 請求 16 路並行）
+        if shutil.which('aria2c'):
+            ydl_opts['external_downloader'] = 'aria2c'
+            ydl_opts['external_downloader_args'] = [
+                '-x', '16', '-s', '16', '-k', '1M', '--file-allocation=none'
+            ]
+
         if progress_callback:
             progress_callback("正在下載影片...")
-        
+
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             ydl.download([url])
-        
-        video_path = os.path.join(output_dir, "video.mp4")
-        audio_path = os.path.join(output_dir, "audio.wav")
-        
-        # 提取音訊
-        if progress_callback:
-            progress_callback("正在提取音訊...")
-        
-        subprocess.run([
-            'ffmpeg', '-y', '-i', video_path,
-            '-vn', '-acodec', 'pcm_s16le', '-ar', '16000', '-ac', '1',
-            audio_path
-        ], capture_output=True)
-        
-        return video_path, audio_path
-    
-    def generate_subtitles(self, audio_path: str, source_lang: str = "auto", 
-                           progress_callback=None) -> List[Segment]:
+
+        return os.path.join(output_dir, "video.mp4")
+
+    def _decode_audio(self, media_path: str):
+        """ffmpeg 直接解碼成 16kHz mono float32 進記憶體，不落地 WAV 暫存檔
+
+        與 meeting_summarizer 相同手法：faster-whisper 可直接吃 ndarray，
+        省掉一小時影片上看數百 MB 的「寫 WAV → 再讀回」磁碟往返。
+
+        Returns:
+            np.ndarray: float32 音訊（值域 [-1, 1]）
         """
-        使用 Whisper 生成字幕
+        import numpy as np
+
+        cmd = [
+            'ffmpeg', '-i', media_path,
+            '-vn', '-f', 's16le', '-acodec', 'pcm_s16le',
+            '-ar', '16000', '-ac', '1',
+            'pipe:1'
+        ]
+
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if proc.returncode != 0:
+            raise RuntimeError(f"音訊解碼失敗: {proc.stderr.decode(errors='ignore')}")
+
+        return np.frombuffer(proc.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+    def _transcribe_stream(self, audio, source_lang: str = "auto") -> Generator[Segment, None, None]:
+        """逐段 yield Whisper 辨識結果（供管線化：邊辨識邊讓下游翻譯/合成）
+
+        audio 可為檔案路徑或 16kHz float32 ndarray。
         """
-        if progress_callback:
-            progress_callback("正在辨識語音...")
-        
-        model = self._get_whisper_model()
-        
         # 設定語言
         language = None if source_lang == "auto" else source_lang[:2]
-        
-        segments_result, info = model.transcribe(
-            audio_path,
+
+        # VAD 先濾掉靜音段（影片素材常有 20-40% 靜音，不必逐窗解碼），
+        # 有 BatchedInferencePipeline 就一次前向解碼多個音窗
+        transcribe_kwargs = dict(
             language=language,
-            word_timestamps=False
+            word_timestamps=False,
+            vad_filter=True,
+            vad_parameters={"min_silence_duration_ms": 500},
         )
-        
-        segments = []
+
+        pipe = self._get_whisper_pipeline()
+        if pipe is not None:
+            segments_result, info = pipe.transcribe(
+                audio, batch_size=self.WHISPER_BATCH_SIZE, **transcribe_kwargs
+            )
+        else:
+            segments_result, info = self._get_whisper_model().transcribe(
+                audio, **transcribe_kwargs
+            )
+
         for seg in segments_result:
-            segments.append(Segment(
+            yield Segment(
                 start=seg.start,
                 end=seg.end,
                 text=seg.text.strip()
-            ))
-        
+            )
+
+    def generate_subtitles(self, audio, source_lang: str = "auto",
+                           progress_callback=None) -> List[Segment]:
+        """
+        使用 Whisper 生成字幕（audio 可為檔案路徑或 16kHz float32 ndarray）
+        """
+        if progress_callback:
+            progress_callback("正在辨識語音...")
+
+        segments = list(self._transcribe_stream(audio, source_lang))
+
         if progress_callback:
             progress_callback(f"辨識完成，共 {len(segments)} 個片段")
-        
+
         return segments
     
     def translate_segments(self, segments: List[Segment], target_lang: str,
                            source_lang: str = "auto",
                            progress_callback=None) -> List[Segment]:
         """
-        翻譯所有字幕片段（長度感知翻譯）
-        
-        透過在 prompt 中加入時間限制，引導模型產生適當長度的翻譯，
-        減少後續音訊重疊問題。
+        翻譯所有字幕片段（去重 + 批次送出）
+
+        譯文長度與時間軸的對齊交給合併階段的 atempo/atrim 處理。
         """
         total = len(segments)
-        
-        # 不同語言的平均語速估計（字/秒）
-        # 用於計算目標翻譯應該有多少字
-        SPEECH_RATE = {
-            "zh_TW": 4.0, "zh_CN": 4.0,  # 中文約 4 字/秒
-            "ja": 5.0,                    # 日文約 5 字/秒  
-            "ko": 4.5,                    # 韓文約 4.5 字/秒
-            "en": 2.5,                    # 英文約 2.5 詞/秒 (按字元算約 12-15 字元/秒)
-            "de": 2.3, "fr": 2.5, "es": 2.8,  # 歐洲語言
-            "default": 3.0
-        }
-        
-        # 取得目標語言的語速
-        target_rate = SPEECH_RATE.get(target_lang, SPEECH_RATE.get(target_lang[:2], SPEECH_RATE["default"]))
-        
-        for i, seg in enumerate(segments):
-            if progress_callback:
-                progress_callback(f"翻譯中... ({i+1}/{total})")
-            
-            # 直接翻譯原文（TranslateGemma 專為翻譯設計，不適合加入額外指令）
-            translated = translator.translate(seg.text, source_lang, target_lang)
-            seg.translated_text = translated
-        
+
+        # 先去重：字幕常有重複句（語氣詞、副歌、講者名，重複率 15-40%），
+        # 每個唯一字串只送模型一次，跨影片的重複再由 translator 的 LFU 快取吃掉
+        texts = list(dict.fromkeys(seg.text for seg in segments))
+        n_unique = len(texts)
+
+        if progress_callback:
+            progress_callback(f"翻譯中... (0/{n_unique})")
+
+        # 片段打包成批次：一批一個請求（攤平 HTTP/prompt 固定成本，
+        # 直接翻譯原文：TranslateGemma 專為翻譯設計，不適合加入額外指令），
+        # 批次之間再平行送出，併發上限由 OLLAMA_NUM_PARALLEL 控制
+        batches = [
+            (start, texts[start:start + TRANSLATE_BATCH_SIZE])
+            for start in range(0, n_unique, TRANSLATE_BATCH_SIZE)
+        ]
+
+        translated_list = [""] * n_unique
+        max_workers = min(len(batches), int(os.environ.get("OLLAMA_NUM_PARALLEL", "4")))
+
+        if max_workers <= 1:
+            for start, batch in batches:
+                translated_list[start:start + len(batch)] = \
+                    translator.translate_batch(batch, source_lang, target_lang)
+                if progress_callback:
+                    progress_callback(f"翻譯中... ({min(start + len(batch), n_unique)}/{n_unique})")
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futures = {
+                    pool.submit(translator.translate_batch, batch, source_lang, target_lang):
+                        (start, len(batch))
+                    for start, batch in batches
+                }
+                done = 0
+                for future in as_completed(futures):
+                    start, length = futures[future]
+                    translated_list[start:start + length] = future.result()
+                    done += length
+                    if progress_callback:
+                        progress_callback(f"翻譯中... ({done}/{n_unique})")
+
+        translated_map = dict(zip(texts, translated_list))
+        for seg in segments:
+            seg.translated_text = translated_map[seg.text]
+
         return segments
     
     async def synthesize_segment_audio(self, segment: Segment, target_lang: str,
-                                        output_dir: str, index: int) -> str:
+                                        output_dir: str, index: int,
+                                        voice: str = None) -> str:
         """
         為單一片段合成語音
+
+        音檔落在內容雜湊快取（translator.tts_cache_path）：同樣的譯文 +
+        語音跨片段、跨影片直接重用，不重打 Edge TTS。
+        批次呼叫端可先解析好 voice 傳入，迴圈內不重查。
         """
-        import edge_tts
-        
-        voice = get_edge_tts_voice(target_lang)
-        output_path = os.path.join(output_dir, f"tts_{index:04d}.mp3")
-        
-        communicate = edge_tts.Communicate(segment.translated_text, voice)
-        await communicate.save(output_path)
-        
+        if voice is None:
+            voice = get_edge_tts_voice(target_lang)
+        output_path = tts_cache_path(voice, segment.translated_text)
+
+        try:
+            if not os.path.exists(output_path):
+                # 原子寫入：同文字併發合成或中途失敗都不會留下壞檔；
+                # 快取修剪等整個工作收尾才做，進行中的片段檔不會被淘汰
+                communicate = edge_tts.Communicate(segment.translated_text, voice)
+                await save_tts_to_cache(communicate, output_path)
+        except Exception as e:
+            # 單段合成失敗不拖垮整部影片：留空 audio_path，合併時自然略過
+            print(f"⚠️ 片段 {index} 語音合成失敗: {e}")
+            segment.audio_path = ""
+            return ""
+
         segment.audio_path = output_path
         return output_path
     
+    # 同時向 Edge TTS 發出的請求上限（太高會被伺服器限流）
+    TTS_MAX_CONCURRENCY = 8
+
     def synthesize_all_audio(self, segments: List[Segment], target_lang: str,
                               output_dir: str, progress_callback=None) -> List[Segment]:
         """
-        為所有片段合成語音
+        為所有片段合成語音（併發送出，重疊各片段的網路等待時間）
         """
         total = len(segments)
-        
+        voice = get_edge_tts_voice(target_lang)
+
         async def run_all():
-            for i, seg in enumerate(segments):
+            sem = asyncio.Semaphore(self.TTS_MAX_CONCURRENCY)
+            done = 0
+
+            async def one(i, seg):
+                nonlocal done
+                async with sem:
+                    await self.synthesize_segment_audio(seg, target_lang, output_dir, i,
+                                                        voice=voice)
+                done += 1
                 if progress_callback:
-                    progress_callback(f"語音合成中... ({i+1}/{total})")
-                await self.synthesize_segment_audio(seg, target_lang, output_dir, i)
-        
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(run_all())
-        loop.close()
-        
+                    progress_callback(f"語音合成中... ({done}/{total})")
+
+            await asyncio.gather(*[one(i, seg) for i, seg in enumerate(segments)])
+
+        asyncio.run_coroutine_threadsafe(run_all(), self._tts_loop).result()
+
         return segments
     
     def get_audio_duration(self, audio_path: str) -> float:
-        """取得音訊時長"""
+        """取得音訊時長
+
+        優先在行程內讀檔頭（MP3 用 mutagen、WAV 用 soundfile），
+        比 fork 一個 ffprobe 便宜幾個數量級；其他格式或套件不在時
+        才退回 ffprobe。
+        """
+        ext = os.path.splitext(audio_path)[1].lower()
+        try:
+            if ext == '.mp3':
+                from mutagen.mp3 import MP3
+                return float(MP3(audio_path).info.length)
+            if ext == '.wav':
+                import soundfile
+                return float(soundfile.info(audio_path).duration)
+        except Exception:
+            pass  # 套件未安裝或檔頭解析失敗，退回 ffprobe
+
         result = subprocess.run([
             'ffprobe', '-v', 'error', '-show_entries', 'format=duration',
             '-of', 'default=noprint_wrappers=1:nokey=1', audio_path
@@ -214,94 +377,104 @@ class VideoDubber:
         except:
             return 0.0
     
-    def adjust_audio_speed(self, audio_path: str, target_duration: float) -> str:
-        """
-        調整音訊速度以符合目標時長
-        """
-        current_duration = self.get_audio_duration(audio_path)
-        
-        if current_duration <= 0:
-            return audio_path
-        
-        speed_factor = current_duration / target_duration
-        
-        # 限制速度範圍 (0.85x - 1.25x)
-        original_speed = speed_factor
-        speed_factor = max(0.85, min(1.25, speed_factor))
-        
-        if abs(speed_factor - 1.0) < 0.05:  # 差異小於 5% 不調整
-            return audio_path
-        
-        output_path = audio_path.replace('.mp3', '_adjusted.mp3')
-        
-        # 如果原始速度超出範圍，記錄警告
-        if (original_speed < 0.85 or original_speed > 1.25):
-            print(f"⚠️ 語速調整受限: 原始需要 {original_speed:.2f}x，實際使用 {speed_factor:.2f}x")
-        
-        # 先調整速度
-        subprocess.run([
-            'ffmpeg', '-y', '-i', audio_path,
-            '-filter:a', f'atempo={speed_factor}',
-            output_path
-        ], capture_output=True)
-        
-        # 如果調整後仍然超過目標時長，則強制截斷（fallback）
-        adjusted_duration = self.get_audio_duration(output_path)
-        if adjusted_duration > target_duration * 1.05:  # 容許 5% 誤差
-            truncated_path = output_path.replace('.mp3', '_truncated.mp3')
-            subprocess.run([
-                'ffmpeg', '-y', '-i', output_path,
-                '-t', str(target_duration),
-                truncated_path
-            ], capture_output=True)
-            return truncated_path
-        
-        return output_path
-    
     def merge_dubbed_audio(self, segments: List[Segment], total_duration: float,
                             output_dir: str, progress_callback=None) -> str:
         """
         合併所有配音片段
+
+        語速調整 (atempo) 直接併進同一張 filter_complex 濾鏡圖，
+        不再為每個片段額外 fork ffmpeg 轉檔出 _adjusted.mp3 中間檔。
         """
         if progress_callback:
             progress_callback("正在合併音軌...")
-        
-        output_path = os.path.join(output_dir, "dubbed_audio.wav")
-        
-        # 使用 ffmpeg 的 adelay 和 amix 濾鏡
+
+        # 直接輸出 AAC：mux 階段就能 -c:a copy 純串流複製，不用再編一次
+        output_path = os.path.join(output_dir, "dubbed_audio.m4a")
+
+        # 使用 ffmpeg 的 atempo、adelay 和 amix 濾鏡
         filter_parts = []
         inputs = []
-        
-        for i, seg in enumerate(segments):
-            if not seg.audio_path or not os.path.exists(seg.audio_path):
+
+        for seg in segments:
+            # audio_path 非空即代表合成成功寫出了檔案（失敗時會留空字串），
+            # 不再對每段多打一次 stat()
+            if not seg.audio_path:
                 continue
-            
+
+            n = len(filter_parts)
+            chain = []
+
             # 調整速度以符合時間軸
             target_duration = seg.end - seg.start
-            adjusted_path = self.adjust_audio_speed(seg.audio_path, target_duration)
-            
-            inputs.extend(['-i', adjusted_path])
+            current_duration = self.get_audio_duration(seg.audio_path)
+
+            if current_duration > 0 and target_duration > 0:
+                speed_factor = current_duration / target_duration
+
+                # 限制速度範圍 (0.85x - 1.25x)
+                clamped = max(0.85, min(1.25, speed_factor))
+                if speed_factor < 0.85 or speed_factor > 1.25:
+                    print(f"⚠️ 語速調整受限: 原始需要 {speed_factor:.2f}x，實際使用 {clamped:.2f}x")
+
+                if abs(clamped - 1.0) >= 0.05:  # 差異小於 5% 不調整
+                    chain.append(f'atempo={clamped:.4f}')
+
+                # 限速後仍超過目標時長則在圖內截斷（fallback，容許 5% 誤差）
+                if current_duration / clamped > target_duration * 1.05:
+                    chain.append(f'atrim=0:{target_duration:.3f}')
+
             delay_ms = int(seg.start * 1000)
-            filter_parts.append(f'[{i}:a]adelay={delay_ms}|{delay_ms}[a{i}]')
-        
+            chain.append(f'adelay={delay_ms}|{delay_ms}')
+
+            inputs.extend(['-i', seg.audio_path])
+            filter_parts.append(f'[{n}:a]{",".join(chain)}[a{n}]')
+
         if not filter_parts:
             return ""
         
-        # 混合所有音軌
-        mix_inputs = ''.join([f'[a{i}]' for i in range(len(filter_parts))])
-        
-        # 使用 loudnorm 進行標準化響度控制 (I=-14 LUFS)
-        filter_complex = ';'.join(filter_parts) + f';{mix_inputs}amix=inputs={len(filter_parts)}:duration=longest:dropout_transition=0,loudnorm=I=-14:TP=-1.0:LRA=11[out]'
+        # 混合所有音軌：amix 每個取樣點都要掃過全部輸入，單一 amix 吃下
+        # 數百軌時成本急遽上升，改成分層混音——每 8 軌先混成一條中繼軌，
+        # 再把中繼軌混成總輸出。各段經 adelay 錯開、互不重疊，所以每層
+        # 都要 normalize=0 純加總：預設的 1/(存活輸入數) 增益會隨各段
+        # 結束時間與分組大小起伏，相鄰字幕音量可差數倍；響度交給 loudnorm
+        MIX_GROUP = 8
+        labels = [f'[a{i}]' for i in range(len(filter_parts))]
+        mix_parts = []
+        if len(labels) > MIX_GROUP:
+            merged = []
+            for gi in range(0, len(labels), MIX_GROUP):
+                group = labels[gi:gi + MIX_GROUP]
+                if len(group) == 1:
+                    merged.append(group[0])
+                    continue
+                out = f'[m{gi // MIX_GROUP}]'
+                mix_parts.append(
+                    f'{"".join(group)}amix=inputs={len(group)}:'
+                    f'duration=longest:dropout_transition=0:normalize=0{out}'
+                )
+                merged.append(out)
+            labels = merged
+
+        # 最後一層混音 + loudnorm 標準化響度控制 (I=-14 LUFS)
+        mix_parts.append(
+            f'{"".join(labels)}amix=inputs={len(labels)}:'
+            f'duration=longest:dropout_transition=0:normalize=0,'
+            f'loudnorm=I=-14:TP=-1.0:LRA=11[out]'
+        )
+        filter_complex = ';'.join(filter_parts + mix_parts)
         
         cmd = ['ffmpeg', '-y'] + inputs + [
             '-filter_complex', filter_complex,
             '-map', '[out]',
             '-t', str(total_duration),
+            '-c:a', 'aac', '-b:a', '192k',
             output_path
         ]
-        
-        subprocess.run(cmd, capture_output=True)
-        
+
+        result = subprocess.run(cmd, capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"音軌合併失敗: {result.stderr.decode(errors='ignore')[-500:]}")
+
         return output_path
     
     def mux_video(self, video_path: str, dubbed_audio_path: str,
@@ -334,17 +507,42 @@ class VideoDubber:
                 "Alignment=2"
             )
             
-            cmd = [
-                'ffmpeg', '-y',
-                '-i', video_path,
-                '-i', dubbed_audio_path,
-                '-vf', f"subtitles='{subtitle_escaped}':force_style='{subtitle_style}'",
-                '-c:v', 'libx264', '-preset', 'fast', '-crf', '23',
-                '-map', '0:v:0',
-                '-map', '1:a:0',
-                '-shortest',
-                output_path
-            ]
+            # 有硬體編碼器就不用 libx264 純 CPU 重編碼
+            # （subtitles 濾鏡在 CPU 上跑，僅替換編碼端，不做整段 hwaccel）
+            encoder = _detect_h264_encoder()
+            if encoder == 'h264_nvenc':
+                codec_args = ['-c:v', encoder, '-preset', 'p4', '-cq', '23']
+            elif encoder == 'libx264':
+                codec_args = ['-c:v', encoder, '-preset', 'fast', '-crf', '23']
+            else:
+                codec_args = ['-c:v', encoder, '-q:v', '60']
+
+            def build_cmd(codec_args):
+                return [
+                    'ffmpeg', '-y',
+                    '-i', video_path,
+                    '-i', dubbed_audio_path,
+                    '-vf', f"subtitles='{subtitle_escaped}':force_style='{subtitle_style}'",
+                ] + codec_args + [
+                    '-c:a', 'copy',
+                    '-map', '0:v:0',
+                    '-map', '1:a:0',
+                    '-shortest',
+                    '-movflags', '+faststart',
+                    output_path
+                ]
+
+            result = subprocess.run(build_cmd(codec_args), capture_output=True)
+            if result.returncode != 0 and encoder != 'libx264':
+                # 探測成功不保證實際畫面也能編（驅動狀態、解析度限制等），
+                # 硬體路徑失敗就退回 libx264 重跑
+                print(f"⚠️ {encoder} 編碼失敗，改用 libx264")
+                result = subprocess.run(
+                    build_cmd(['-c:v', 'libx264', '-preset', 'fast', '-crf', '23']),
+                    capture_output=True
+                )
+            if result.returncode != 0:
+                raise RuntimeError(f"影片合成失敗: {result.stderr.decode(errors='ignore')[-500:]}")
         else:
             # 不燒錄字幕
             cmd = [
@@ -352,37 +550,51 @@ class VideoDubber:
                 '-i', video_path,
                 '-i', dubbed_audio_path,
                 '-c:v', 'copy',
+                '-c:a', 'copy',
                 '-map', '0:v:0',
                 '-map', '1:a:0',
                 '-shortest',
+                '-movflags', '+faststart',
                 output_path
             ]
-        
-        subprocess.run(cmd, capture_output=True)
-        
+            result = subprocess.run(cmd, capture_output=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"影片合成失敗: {result.stderr.decode(errors='ignore')[-500:]}")
+
         return output_path
     
     def generate_srt(self, segments: List[Segment], output_dir: str, use_translated: bool = False) -> str:
         """
         產生 SRT 字幕檔
+
+        時間戳用 NumPy 一次算完所有片段的 h/m/s/ms（不逐段跑 Python 除法），
+        整份內容組好後單次寫出，不逐行 write。
         """
+        import numpy as np
+
         filename = "translated.srt" if use_translated else "original.srt"
         output_path = os.path.join(output_dir, filename)
-        
-        def format_time(seconds: float) -> str:
-            hours = int(seconds // 3600)
-            minutes = int((seconds % 3600) // 60)
-            secs = int(seconds % 60)
-            millis = int((seconds % 1) * 1000)
-            return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
-        
+
+        def format_times(seconds):
+            t = np.asarray(seconds, dtype=np.float64)
+            h = (t // 3600).astype(int)
+            m = ((t % 3600) // 60).astype(int)
+            s = (t % 60).astype(int)
+            ms = ((t % 1) * 1000).astype(int)
+            return [f"{H:02d}:{M:02d}:{S:02d},{MS:03d}"
+                    for H, M, S, MS in zip(h, m, s, ms)]
+
+        start_ts = format_times([seg.start for seg in segments])
+        end_ts = format_times([seg.end for seg in segments])
+
+        lines = []
+        for i, seg in enumerate(segments):
+            text = seg.translated_text if use_translated else seg.text
+            lines.append(f"{i + 1}\n{start_ts[i]} --> {end_ts[i]}\n{text}\n\n")
+
         with open(output_path, 'w', encoding='utf-8') as f:
-            for i, seg in enumerate(segments, 1):
-                text = seg.translated_text if use_translated else seg.text
-                f.write(f"{i}\n")
-                f.write(f"{format_time(seg.start)} --> {format_time(seg.end)}\n")
-                f.write(f"{text}\n\n")
-        
+            f.write("".join(lines))
+
         return output_path
     
     def process_video(self, video_source: str, source_lang: str, target_lang: str,
@@ -392,45 +604,102 @@ class VideoDubber:
         """
         完整處理流程
         """
+        # 註冊在途工作：期間任何人（含其他工作收尾）都不會修剪 TTS 快取
+        tts_job_started()
+        try:
+            return self._process_video(video_source, source_lang, target_lang,
+                                       burn_subtitles, progress_callback, job_dir)
+        finally:
+            tts_job_finished()
+
+    def _process_video(self, video_source: str, source_lang: str, target_lang: str,
+                       burn_subtitles: bool = False,
+                       progress_callback=None,
+                       job_dir: str = None) -> dict:
         # 建立工作目錄 (若未指定)
         job_dir = job_dir or self._create_job_dir()
         
         results = {}
-        
+
+        # 背景預載 Whisper：模型載入與下載/解碼重疊，辨識開始時已就緒
+        # （工廠有快取，已載入時這只是個 no-op）
+        warmup = threading.Thread(target=self._get_whisper_model, daemon=True)
+        warmup.start()
+
         # 判斷是 URL 還是檔案路徑
         if video_source.startswith('http'):
-            video_path, audio_path = self.download_youtube(video_source, job_dir, progress_callback)
+            video_path = self.download_youtube(video_source, job_dir, progress_callback)
         else:
             video_path = video_source
-            audio_path = os.path.join(job_dir, "audio.wav")
-            # 轉換本地影片音訊
-            subprocess.run([
-                'ffmpeg', '-y', '-i', video_path,
-                '-vn', '-acodec', 'pcm_s16le', '-ar', '16000', '-ac', '1',
-                audio_path
-            ], capture_output=True)
-        
+
+        # 解碼音訊進記憶體（不落地 WAV）
+        if progress_callback:
+            progress_callback("正在提取音訊...")
+        audio = self._decode_audio(video_path)
+
         results['original_video'] = video_path
-        
-        # 生成字幕
-        segments = self.generate_subtitles(audio_path, source_lang, progress_callback)
-        
-        # 產生原始 SRT
+
+        # ASR → 翻譯 → TTS 管線化：Whisper 還在辨識後段時，先出爐的片段
+        # 已經分批送翻譯，譯好的批次立刻排入 TTS——總時長趨近最慢階段
+        # 而非三階段相加
+        if progress_callback:
+            progress_callback("正在辨識語音...")
+
+        voice = get_edge_tts_voice(target_lang)
+
+        def _translate_and_synthesize(group):
+            translated = translator.translate_batch(
+                [seg.text for seg in group], source_lang, target_lang
+            )
+            for seg, translated_text in zip(group, translated):
+                seg.translated_text = translated_text
+
+            async def synth():
+                sem = asyncio.Semaphore(self.TTS_MAX_CONCURRENCY)
+
+                async def one(index, seg):
+                    async with sem:
+                        await self.synthesize_segment_audio(seg, target_lang, job_dir, index,
+                                                            voice=voice)
+
+                await asyncio.gather(*[one(i, seg) for i, seg in enumerate(group)])
+
+            # 丟上常駐 TTS loop 後立刻返回，下一批翻譯不等語音合成
+            return asyncio.run_coroutine_threadsafe(synth(), self._tts_loop)
+
+        segments = []
+        group = []
+        with ThreadPoolExecutor(max_workers=2) as pipeline_pool:
+            dispatched = []
+            for seg in self._transcribe_stream(audio, source_lang):
+                segments.append(seg)
+                group.append(seg)
+                if len(group) >= TRANSLATE_BATCH_SIZE:
+                    dispatched.append(pipeline_pool.submit(_translate_and_synthesize, group))
+                    group = []
+                    if progress_callback:
+                        progress_callback(f"辨識中... 已送出 {len(segments)} 個片段")
+            if group:
+                dispatched.append(pipeline_pool.submit(_translate_and_synthesize, group))
+
+            if progress_callback:
+                progress_callback(f"辨識完成，共 {len(segments)} 個片段，等待翻譯與語音合成...")
+
+            tts_waits = [future.result() for future in dispatched]
+
+        # 等所有 TTS 批次落地
+        for wait in tts_waits:
+            wait.result()
+
+        # 產生原始/翻譯 SRT（需要完整片段清單，放在管線收攏之後）
         results['original_srt'] = self.generate_srt(segments, job_dir, use_translated=False)
-        
-        # 翻譯
-        segments = self.translate_segments(segments, target_lang, source_lang, progress_callback)
-        
-        # 產生翻譯 SRT
         translated_srt = self.generate_srt(segments, job_dir, use_translated=True)
         results['translated_srt'] = translated_srt
-        
-        # 合成語音
-        segments = self.synthesize_all_audio(segments, target_lang, job_dir, progress_callback)
-        
-        # 取得影片總時長
-        total_duration = self.get_audio_duration(audio_path)
-        
+
+
+        # 取得影片總時長（音訊已在記憶體，直接用樣本數換算）
+        total_duration = len(audio) / 16000.0
+
         # 合併配音音軌
         dubbed_audio = self.merge_dubbed_audio(segments, total_duration, job_dir, progress_callback)
         
@@ -443,87 +712,138 @@ class VideoDubber:
                 burn_subtitles=burn_subtitles,
                 progress_callback=progress_callback
             )
-        
+
         if progress_callback:
             progress_callback("✅ 處理完成！")
-        
+
         return results
-    
+
     def process_video_batch(self, video_source: str, source_lang: str, target_langs: list,
                              burn_subtitles: bool = False,
                              progress_callback=None) -> dict:
         """
         批次處理多語言翻譯
         """
+        # 同 process_video：整個批次算一個在途工作，收尾時（無其他
+        # 在途工作）才修剪 TTS 快取
+        tts_job_started()
+        try:
+            return self._process_video_batch(video_source, source_lang, target_langs,
+                                             burn_subtitles, progress_callback)
+        finally:
+            tts_job_finished()
+
+    def _process_video_batch(self, video_source: str, source_lang: str, target_langs: list,
+                              burn_subtitles: bool = False,
+                              progress_callback=None) -> dict:
         # 建立主工作目錄
         job_dir = self._create_job_dir(prefix="batch_job")
         
         batch_results = {}
         total_langs = len(target_langs)
-        
-        # 先下載/提取音訊（只做一次）
+
+        # 背景預載 Whisper，與下載/解碼重疊（同 process_video）
+        warmup = threading.Thread(target=self._get_whisper_model, daemon=True)
+        warmup.start()
+
+        # 先下載/解碼音訊（只做一次）
         if video_source.startswith('http'):
-            video_path, audio_path = self.download_youtube(video_source, job_dir, progress_callback)
+            video_path = self.download_youtube(video_source, job_dir, progress_callback)
         else:
             video_path = video_source
-            audio_path = os.path.join(job_dir, "audio.wav")
-            subprocess.run([
-                'ffmpeg', '-y', '-i', video_path,
-                '-vn', '-acodec', 'pcm_s16le', '-ar', '16000', '-ac', '1',
-                audio_path
-            ], capture_output=True)
-        
+
+        if progress_callback:
+            progress_callback("正在提取音訊...")
+        audio = self._decode_audio(video_path)
+
         # 生成字幕（只做一次）
-        segments = self.generate_subtitles(audio_path, source_lang, progress_callback)
+        segments = self.generate_subtitles(audio, source_lang, progress_callback)
         original_srt = self.generate_srt(segments, job_dir, use_translated=False)
         batch_results['original_video'] = video_path
         batch_results['original_srt'] = original_srt
         batch_results['languages'] = {}
         
-        # 對每個語言進行處理
-        for i, target_lang in enumerate(target_langs):
-            if progress_callback:
-                progress_callback(f"處理語言 {i+1}/{total_langs}: {target_lang}")
-            
+        # 取得影片總時長（各語言共用；音訊已在記憶體，直接用樣本數換算）
+        total_duration = len(audio) / 16000.0
+
+        # 多執行緒同時回報進度時加上語言前綴，訊息才讀得出來自哪條 pipeline
+        progress_lock = threading.Lock()
+
+        def _lang_progress(target_lang: str):
+            if progress_callback is None:
+                return None
+
+            def _report(msg):
+                with progress_lock:
+                    progress_callback(f"[{target_lang}] {msg}")
+            return _report
+
+        def _dub_one_language(target_lang: str) -> dict:
+            """翻譯 + 配音 + 合成單一語言（供平行處理）"""
+            report = _lang_progress(target_lang)
+
             # 建立語言專屬子目錄，避免檔名衝突
             lang_dir = os.path.join(job_dir, target_lang)
             os.makedirs(lang_dir, exist_ok=True)
-            
+
             lang_result = {}
-            
-            # 複製 segments (Deep copy segments)
-            import copy
-            lang_segments = copy.deepcopy(segments)
-            
+
+            # 每語言要獨立的 translated_text/audio_path，但 start/end/text 都是
+            # 不可變純量——直接重建 dataclass 即可，不必走 deepcopy 的 pickle 開銷
+            lang_segments = [Segment(seg.start, seg.end, seg.text) for seg in segments]
+
             # 翻譯
-            lang_segments = self.translate_segments(lang_segments, target_lang, source_lang, progress_callback)
-            
+            lang_segments = self.translate_segments(lang_segments, target_lang, source_lang, report)
+
             # 產生翻譯 SRT
             translated_srt = self.generate_srt(lang_segments, lang_dir, use_translated=True)
             lang_result['translated_srt'] = translated_srt
-            
+
             # 合成語音
-            lang_segments = self.synthesize_all_audio(lang_segments, target_lang, lang_dir, progress_callback)
-            
-            # 取得影片總時長
-            total_duration = self.get_audio_duration(audio_path)
-            
+            lang_segments = self.synthesize_all_audio(lang_segments, target_lang, lang_dir, report)
+
             # 合併配音音軌
-            dubbed_audio = self.merge_dubbed_audio(lang_segments, total_duration, lang_dir, progress_callback)
-            
+            dubbed_audio = self.merge_dubbed_audio(lang_segments, total_duration, lang_dir, report)
+
             # 合成影片
             if dubbed_audio:
-                dubbed_video = self.mux_video(
+                lang_result['dubbed_video'] = self.mux_video(
                     video_path, dubbed_audio,
                     output_dir=lang_dir,
                     subtitle_path=translated_srt,
                     burn_subtitles=burn_subtitles,
-                    progress_callback=progress_callback
+                    progress_callback=report
                 )
-                lang_result['dubbed_video'] = dubbed_video
-            
-            batch_results['languages'][target_lang] = lang_result
-        
+
+            return lang_result
+
+        # 各語言平行處理：總時間趨近於 max(單語言) 而非 sum(單語言)
+        # worker 數量可用 TG_DUB_WORKERS 調整（預設 2，避免 Ollama/TTS 過載），
+        # 上限不超過 CPU 核心數
+        max_workers = min(
+            total_langs,
+            int(os.environ.get("TG_DUB_WORKERS", "2")),
+            os.cpu_count() or 1
+        )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(_dub_one_language, lang): lang for lang in target_langs}
+            done_count = 0
+            for future in as_completed(futures):
+                lang = futures[future]
+                done_count += 1
+                # 單一語言失敗（ffmpeg 合併/合成會 raise）只記錄錯誤，
+                # 不拖垮其他已完成的語言
+                try:
+                    batch_results['languages'][lang] = future.result()
+                    msg = f"完成語言 {done_count}/{total_langs}: {lang}"
+                except Exception as e:
+                    batch_results['languages'][lang] = {"error": str(e)}
+                    msg = f"語言 {lang} 處理失敗 ({done_count}/{total_langs}): {e}"
+                if progress_callback:
+                    with progress_lock:
+                        progress_callback(msg)
+
         if progress_callback:
             progress_callback(f"✅ 批次處理完成！共處理 {total_langs} 種語言")
         